@@ -0,0 +1,134 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from src.db import get_database
+from src.llm_implementation import aprompt_llm
+
+JOBS_COLLECTION = "prompt_jobs"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_SECONDS = 1.0
+JOB_RETRY_BACKOFF_SECONDS = 5
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def _jobs():
+    return get_database().get_collection(JOBS_COLLECTION)
+
+async def enqueue_job(system_message, user_message, model):
+    """Persist a new prompt job and return its id"""
+    now = _now()
+    job = {
+        "status": "queued",
+        "system_message": system_message,
+        "user_message": user_message,
+        "model": model,
+        "attempts": 0,
+        "max_attempts": JOB_MAX_ATTEMPTS,
+        "available_at": now,
+        "created_at": now,
+    }
+    result = await _jobs().insert_one(job)
+    return result.inserted_id
+
+async def claim_job(worker_id):
+    """
+    Atomically take the oldest job that is queued, or running with an expired
+    lease (its worker died), and lease it to this worker.
+    """
+    now = _now()
+    return await _jobs().find_one_and_update(
+        {"$or": [
+            {"status": "queued", "available_at": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}},
+        ]},
+        {
+            "$set": {
+                "status": "running",
+                "worker_id": worker_id,
+                "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("available_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+async def _renew_lease(job_id, worker_id):
+    """Keep extending the lease while the job is being generated"""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        await _jobs().update_one(
+            {"_id": job_id, "worker_id": worker_id, "status": "running"},
+            {"$set": {"lease_until": _now() + timedelta(seconds=JOB_LEASE_SECONDS)}},
+        )
+
+async def process_job(job, worker_id):
+    """Run a claimed job, store its response and mark it completed, requeued or failed"""
+    if job["attempts"] > job["max_attempts"]:
+        # Workers kept dying on this job, so stop reclaiming it
+        await _jobs().update_one(
+            {"_id": job["_id"], "worker_id": worker_id},
+            {"$set": {"status": "failed", "error": "Lease expired too many times"}},
+        )
+        return
+
+    renewer = asyncio.create_task(_renew_lease(job["_id"], worker_id))
+    try:
+        response = await aprompt_llm(job["user_message"], job["system_message"], job["model"])
+    except Exception as e:
+        print(f"Job {job['_id']} attempt {job['attempts']} failed: {e}")
+        retry = job["attempts"] < job["max_attempts"]
+        update = {"status": "queued" if retry else "failed", "error": str(e)}
+        if retry:
+            update["available_at"] = _now() + timedelta(seconds=JOB_RETRY_BACKOFF_SECONDS * job["attempts"])
+        await _jobs().update_one({"_id": job["_id"], "worker_id": worker_id}, {"$set": update})
+        return
+    finally:
+        renewer.cancel()
+
+    response_doc = {
+        "system_message": job["system_message"],
+        "user_message": job["user_message"],
+        "model": job["model"],
+        "response": response.content,
+        "job_id": str(job["_id"]),
+    }
+    result = await get_database().get_collection("responses").insert_one(response_doc)
+    await _jobs().update_one(
+        {"_id": job["_id"], "worker_id": worker_id},
+        {"$set": {
+            "status": "completed",
+            "response_id": str(result.inserted_id),
+            "finished_at": _now(),
+        }},
+    )
+
+async def run_worker(worker_id=None):
+    """Drain the queue until cancelled"""
+    worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+    while True:
+        try:
+            job = await claim_job(worker_id)
+            if job is None:
+                await asyncio.sleep(JOB_POLL_SECONDS)
+                continue
+            await process_job(job, worker_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Job worker {worker_id} error: {e}")
+            await asyncio.sleep(JOB_POLL_SECONDS)
+
+def start_workers(count=JOB_WORKERS):
+    return [asyncio.create_task(run_worker()) for _ in range(count)]
+
+async def stop_workers(workers):
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
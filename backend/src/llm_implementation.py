@@ -1,7 +1,17 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict
 from langchain_ollama import ChatOllama
 from langchain.prompts import PromptTemplate
+from src.model_registry import OLLAMA_BASE_URL
 from src.routes.llms import get_current_selected_llm
 
+# Maximum number of generations allowed to run against Ollama at the same time
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Maximum number of model clients kept alive at the same time
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "4"))
+
 template = """
 System message: {system_message}
 
@@ -14,18 +24,72 @@ prompt = PromptTemplate(
     input_variables=["query", "system_message"],
 )
 
-llm = None
+class LLMClientPool:
+    """LRU pool of ChatOllama clients keyed by model and generation params"""
+
+    def __init__(self, max_clients=LLM_POOL_SIZE):
+        self.max_clients = max_clients
+        self._clients = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model, **params):
+        key = (model, tuple(sorted(params.items())))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = ChatOllama(model=model, base_url=OLLAMA_BASE_URL, **params)
+                self._clients[key] = client
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(key)
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+llm_pool = LLMClientPool()
+
+# Created lazily so it binds to the event loop serving the requests
+_llm_semaphore = None
+
+def get_llm_semaphore():
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _llm_semaphore
 
-def prompt_llm(query, system_message):
-    global llm
-    selected_llm = get_current_selected_llm()
+def format_prompt(query, system_message):
+    return prompt.format(query=query, system_message=system_message)
+
+def _prepare_prompt(query, system_message, model=None):
+    """Return the client for the requested or selected model and the formatted prompt"""
+    selected_llm = model or get_current_selected_llm()
     if not selected_llm:
         raise ValueError("No LLM model selected")
-    
-    if llm is None or llm.model != selected_llm:
-        llm = ChatOllama(model=selected_llm, base_url="http://host.docker.internal:11434")
-    
+
+    client = llm_pool.get(selected_llm)
+
     print(f"Selected LLM: {selected_llm}")
-    formatted_prompt = prompt.format(query=query, system_message=system_message)
+    formatted_prompt = format_prompt(query, system_message)
     print("Formatted prompt: ", formatted_prompt)
-    return llm.invoke(formatted_prompt)
\ No newline at end of file
+    return client, formatted_prompt
+
+def prompt_llm(query, system_message, model=None):
+    client, formatted_prompt = _prepare_prompt(query, system_message, model)
+    return client.invoke(formatted_prompt)
+
+async def aprompt_llm(query, system_message, model=None):
+    """Async variant of prompt_llm that does not block the event loop"""
+    client, formatted_prompt = _prepare_prompt(query, system_message, model)
+    async with get_llm_semaphore():
+        return await client.ainvoke(formatted_prompt)
+
+async def astream_llm(query, system_message, model=None):
+    """Yield the generated text chunk by chunk as Ollama produces it"""
+    client, formatted_prompt = _prepare_prompt(query, system_message, model)
+    async with get_llm_semaphore():
+        async for chunk in client.astream(formatted_prompt):
+            if chunk.content:
+                yield chunk.content
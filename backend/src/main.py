@@ -1,43 +1,53 @@
+import json
 import logging
-import requests
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from contextlib import asynccontextmanager
-from src.llm_implementation import prompt_llm
+from langchain_core.messages import AIMessage
+from src.llm_implementation import aprompt_llm, astream_llm, format_prompt
 from src.models import PromptRequest
 from src.routes.messages import router as messages_router
-from src.routes.llms import router as llms_router, set_selected_llm
+from src.routes.llms import router as llms_router, set_selected_llm, resolve_model
 from src.routes.responses import router as responses_router
+from src.routes.batches import router as batches_router
+from src.routes.jobs import router as jobs_router
+from src import job_queue
 from fastapi.middleware.cors import CORSMiddleware
 from src.db import init_db
-from src.db import get_database
+from src.db import get_database, close_client, pool_stats
+from src.model_registry import model_registry, ModelRegistryError
+from src.response_cache import response_cache, make_cache_key
+from src.query_plans import explain_queries
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Connect to MongoDB
-    client, _ = init_db()
+    client, _ = await init_db()
     app.mongodb_client = client
+    workers = []
+    if client:
+        workers = job_queue.start_workers()
 
     # Fetch available LLMs and set the first one as the selected model
     try:
-        response = requests.get("http://host.docker.internal:11434/api/tags")
-        response.raise_for_status()
-        data = response.json()
-        llms_available = data.get("models", [])
+        llms_available = await model_registry.get_models()
         
         if llms_available:
-            from src.routes.llms import set_selected_llm
-            set_selected_llm(llms_available[0]["name"])
-            print(f"Selected LLM on startup: {llms_available[0]['name']}")
+            set_selected_llm(llms_available[0])
+            print(f"Selected LLM on startup: {llms_available[0]}")
         else:
             print("No LLMs available to select on startup.")
-    except requests.exceptions.RequestException as e:
+    except ModelRegistryError as e:
         print(f"Failed to fetch models on startup: {str(e)}")
 
     yield
+
+    await job_queue.stop_workers(workers)
+    await model_registry.aclose()
     
     # Disconnect from MongoDB
     if hasattr(app, 'mongodb_client') and app.mongodb_client:
-        app.mongodb_client.close()
+        await close_client()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -47,11 +57,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor"],
 )
 
 app.include_router(messages_router)
 app.include_router(llms_router)
 app.include_router(responses_router)
+app.include_router(batches_router)
+app.include_router(jobs_router)
 
 @app.get("/")
 async def root():
@@ -59,26 +72,95 @@ async def root():
 
 @app.post("/prompt")
 async def prompt(prompt: PromptRequest):
-    response = prompt_llm(prompt.system_message, prompt.user_message)
+    model = await resolve_model(prompt.model)
+    cache_key = make_cache_key(format_prompt(prompt.user_message, prompt.system_message), model)
+    cached = await response_cache.get(cache_key)
+
+    if cached:
+        response = AIMessage(content=cached["response"])
+    else:
+        # Awaiting the async client keeps other requests responsive during generation
+        response = await aprompt_llm(prompt.user_message, prompt.system_message, model)
     
     response_content = response.content
     
     response_doc = {
         "system_message": prompt.system_message,
         "user_message": prompt.user_message,
-        "response": response_content
+        "model": model,
+        "response": response_content,
+        "cache_key": cache_key
     }
+    if cached:
+        response_doc["cached_from"] = cached["response_id"]
     
     # Insert the prompt messages and response into the "responses" collection
     db = get_database()
     responses = db.get_collection("responses")
 
     
-    result = responses.insert_one(response_doc)
+    result = await responses.insert_one(response_doc)
     print(f"Inserted response document with ID: {result.inserted_id}")
+
+    if not cached:
+        await response_cache.set(cache_key, response_content, str(result.inserted_id), model)
     
     return {"response_id": str(result.inserted_id), "response": response}
 
+@app.get("/prompt/cache/stats")
+async def prompt_cache_stats():
+    return response_cache.stats()
+
+# Report how MongoDB runs the main queries, to check that they use an index
+@app.get("/db/explain")
+async def db_explain():
+    db = get_database()
+    if db is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    return await explain_queries(db)
+
+# Connection pool counters of the shared MongoDB client
+@app.get("/db/pool")
+async def db_pool():
+    return pool_stats.stats()
+
+
+def _sse_event(data, event=None):
+    """Format a payload as a Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+@app.post("/prompt/stream")
+async def prompt_stream(prompt: PromptRequest):
+    model = await resolve_model(prompt.model)
+
+    async def event_stream():
+        chunks = []
+        try:
+            async for token in astream_llm(prompt.user_message, prompt.system_message, model):
+                chunks.append(token)
+                yield _sse_event({"token": token})
+        except Exception as e:
+            yield _sse_event({"detail": str(e)}, event="error")
+            return
+
+        response_doc = {
+            "system_message": prompt.system_message,
+            "user_message": prompt.user_message,
+            "model": model,
+            "response": "".join(chunks)
+        }
+
+        # Store the finished response once the stream has ended
+        db = get_database()
+        responses = db.get_collection("responses")
+        result = await responses.insert_one(response_doc)
+        print(f"Inserted response document with ID: {result.inserted_id}")
+
+        yield _sse_event({"response_id": str(result.inserted_id)}, event="done")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 
 # @app.post("/prompt")
 # async def prompt(prompt: PromptRequest):
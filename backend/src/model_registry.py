@@ -0,0 +1,89 @@
+import asyncio
+import os
+import time
+import httpx
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")
+
+# How long the model list is served without asking Ollama again
+MODEL_REGISTRY_TTL_SECONDS = float(os.getenv("MODEL_REGISTRY_TTL_SECONDS", "30"))
+# How long past the TTL a stale list is still served while it is refreshed
+MODEL_REGISTRY_MAX_STALE_SECONDS = float(os.getenv("MODEL_REGISTRY_MAX_STALE_SECONDS", "300"))
+
+class ModelRegistryError(Exception):
+    """Raised when the available models cannot be fetched and nothing usable is cached"""
+
+class ModelRegistry:
+    """
+    Cached list of the models Ollama serves. Fresh lists are returned from
+    memory, stale ones are returned while a background refresh runs, and only
+    an empty or expired cache makes the caller wait for Ollama.
+    """
+
+    def __init__(self, base_url=OLLAMA_BASE_URL, ttl_seconds=MODEL_REGISTRY_TTL_SECONDS,
+                 max_stale_seconds=MODEL_REGISTRY_MAX_STALE_SECONDS, transport=None):
+        self.base_url = base_url
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self._transport = transport
+        self._client = None
+        self._models = None
+        self._fetched_at = 0.0
+        self._refresh_task = None
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=5.0,
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=5),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def refresh(self):
+        """Fetch the model list from Ollama and cache it"""
+        try:
+            response = await self._get_client().get("/api/tags")
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise ModelRegistryError(str(e)) from e
+        self._models = [model["name"] for model in response.json().get("models", [])]
+        self._fetched_at = time.monotonic()
+        return self._models
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except ModelRegistryError as e:
+            print(f"Background model refresh failed: {e}")
+
+    def _schedule_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def get_models(self):
+        """Return the names of the available models"""
+        age = time.monotonic() - self._fetched_at
+        if self._models is not None:
+            if age < self.ttl_seconds:
+                return self._models
+            if age < self.ttl_seconds + self.max_stale_seconds:
+                self._schedule_refresh()
+                return self._models
+
+        if self._refresh_task is not None and not self._refresh_task.done():
+            # Share the refresh that is already in flight
+            await self._refresh_task
+            if self._models is not None and time.monotonic() - self._fetched_at < self.ttl_seconds:
+                return self._models
+        return await self.refresh()
+
+    async def aclose(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+model_registry = ModelRegistry()
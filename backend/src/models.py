@@ -1,10 +1,15 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
 
     
 class PromptRequest(BaseModel):
     system_message: str
     user_message: str
+    model: Optional[str] = None
     
 class MessageRequest(BaseModel):
-    message: str
\ No newline at end of file
+    message: str
+class BatchPromptRequest(BaseModel):
+    items: List[PromptRequest]
+    parallelism: Optional[int] = Field(None, ge=1)
+    model: Optional[str] = None
@@ -0,0 +1,52 @@
+from typing import Literal, Optional
+from fastapi import HTTPException, Query, Response
+from bson import ObjectId
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    order: Literal["asc", "desc"] = "asc",
+):
+    """Query parameters shared by the list endpoints"""
+    return {"limit": limit, "after": after, "fields": fields, "exclude": exclude, "order": order}
+
+def build_projection(fields=None, exclude=None):
+    """Turn comma separated field lists into a MongoDB projection"""
+    if fields and exclude:
+        raise HTTPException(status_code=400, detail="Use either fields or exclude, not both")
+    if fields:
+        return {name.strip(): 1 for name in fields.split(",") if name.strip()}
+    if exclude:
+        return {name.strip(): 0 for name in exclude.split(",") if name.strip() and name.strip() != "_id"}
+    return None
+
+async def paginate(collection, response: Response, limit=DEFAULT_PAGE_SIZE, after=None, fields=None, exclude=None, order="asc"):
+    """
+    Return one page of documents ordered by _id, oldest first or with
+    order="desc" newest first, starting after the given cursor.
+
+    The next cursor and an estimated total count are returned in the
+    X-Next-Cursor and X-Total-Count headers.
+    """
+    descending = order == "desc"
+    query = {}
+    if after:
+        if not ObjectId.is_valid(after):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query["_id"] = {"$lt" if descending else "$gt": ObjectId(after)}
+
+    cursor = collection.find(query, build_projection(fields, exclude))
+    items = await cursor.sort("_id", -1 if descending else 1).limit(limit).to_list()
+
+    for item in items:
+        item["_id"] = str(item["_id"])
+
+    response.headers["X-Total-Count"] = str(await collection.estimated_document_count())
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = items[-1]["_id"]
+    return items
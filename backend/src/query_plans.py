@@ -0,0 +1,79 @@
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo.errors import PyMongoError
+from src.pagination import DEFAULT_PAGE_SIZE
+
+# An _id to page after, plans depend on the shape of a query and not on its values
+_CURSOR = ObjectId("0" * 24)
+_NOW = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+# The main queries of the routes, explained by explain_queries()
+QUERIES = [
+    {"name": "user_messages_page", "collection": "user_messages",
+     "filter": {"_id": {"$gt": _CURSOR}}, "sort": [("_id", 1)], "limit": DEFAULT_PAGE_SIZE},
+    {"name": "system_messages_page", "collection": "system_messages",
+     "filter": {"_id": {"$gt": _CURSOR}}, "sort": [("_id", 1)], "limit": DEFAULT_PAGE_SIZE},
+    {"name": "responses_page", "collection": "responses",
+     "filter": {"_id": {"$gt": _CURSOR}}, "sort": [("_id", 1)], "limit": DEFAULT_PAGE_SIZE},
+    {"name": "responses_newest_page", "collection": "responses",
+     "filter": {"_id": {"$lt": _CURSOR}}, "sort": [("_id", -1)], "limit": DEFAULT_PAGE_SIZE},
+    {"name": "responses_export_by_model", "collection": "responses",
+     "filter": {"_id": {"$gte": _CURSOR}, "model": "llama3.1"}, "sort": [("_id", 1)]},
+    {"name": "batch_results", "collection": "responses",
+     "filter": {"batch_id": str(_CURSOR)}, "projection": {"batch_index": 1, "response": 1}},
+    {"name": "batch_by_id", "collection": "message_batches",
+     "filter": {"_id": _CURSOR}, "projection": {"items": 0, "errors": 0}},
+    {"name": "batches_by_status", "collection": "message_batches",
+     "filter": {"status": "running"}, "sort": [("created_at", -1)], "limit": DEFAULT_PAGE_SIZE},
+    # Run by every job worker once a second, see job_queue.claim_job
+    {"name": "job_claim", "collection": "prompt_jobs",
+     "filter": {"$or": [
+         {"status": "queued", "available_at": {"$lte": _NOW}},
+         {"status": "running", "lease_until": {"$lt": _NOW}},
+     ]}, "sort": [("available_at", 1)], "limit": 1},
+    {"name": "response_cache_lookup", "collection": "response_cache",
+     "filter": {"_id": "0" * 64, "expires_at": {"$gt": _NOW}}},
+    {"name": "open_sonar_issues", "collection": "sonar_issues",
+     "filter": {"project": "quality", "status": {"$in": ["OPEN", "CONFIRMED", "REOPENED"]}}},
+]
+
+def _stages(plan):
+    """Yield the stages of a plan tree, from the root down"""
+    yield plan
+    for child in [plan.get("inputStage"), *plan.get("inputStages", [])]:
+        if child:
+            yield from _stages(child)
+
+def summarize_plan(explained):
+    """Reduce an explain() result to the winning plan's stages, indexes and cost"""
+    winning = explained["queryPlanner"]["winningPlan"]
+    # Plans run by the slot based engine are nested one level deeper
+    winning = winning.get("queryPlan", winning)
+    stages = list(_stages(winning))
+    stats = explained.get("executionStats", {})
+    return {
+        "stages": [stage["stage"] for stage in stages],
+        "indexes": [stage["indexName"] for stage in stages if "indexName" in stage],
+        "collection_scan": any(stage["stage"] == "COLLSCAN" for stage in stages),
+        "returned": stats.get("nReturned"),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "time_ms": stats.get("executionTimeMillis"),
+    }
+
+async def explain_queries(db, queries=QUERIES):
+    """Explain each query and report how MongoDB runs it"""
+    report = []
+    for query in queries:
+        entry = {"name": query["name"], "collection": query["collection"]}
+        cursor = db.get_collection(query["collection"]).find(query["filter"], query.get("projection"))
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        if query.get("limit"):
+            cursor = cursor.limit(query["limit"])
+        try:
+            entry.update(summarize_plan(await cursor.explain()))
+        except PyMongoError as e:
+            entry["error"] = str(e)
+        report.append(entry)
+    return report
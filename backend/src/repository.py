@@ -1,9 +1,13 @@
-from pymongo import MongoClient
+from src.db import MONGO_DB_NAME, get_client
 
+# Set by init_db(), on the client shared with src.db
+client = None
+db = None
+batches_collection = None
 
-MONGO_URI = "mongodb://localhost:27017"
-DB_NAME = "llm_dispatch"
-
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
-batches_collection = db["message_batches"]
\ No newline at end of file
+def init_db():
+    """Point the repository at the shared client, without connecting"""
+    global client, db, batches_collection
+    client = get_client()
+    db = client[MONGO_DB_NAME]
+    batches_collection = db["message_batches"]
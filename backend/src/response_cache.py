@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pymongo.errors import PyMongoError
+from src.db import get_database
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+CACHE_COLLECTION = "response_cache"
+
+def make_cache_key(formatted_prompt, model, params=None):
+    """Content address for a prompt: hash of the prompt text, model and generation params"""
+    payload = json.dumps(
+        {"prompt": formatted_prompt, "model": model, "params": params or {}},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Two tier cache of LLM responses: an in-process LRU in front of a
+    MongoDB collection whose documents expire through a TTL index, see
+    INDEXES in src.db.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_SIZE, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _collection(self):
+        db = get_database()
+        return db.get_collection(CACHE_COLLECTION) if db is not None else None
+
+    def _remember(self, key, entry):
+        self._entries[key] = (entry, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key):
+        """Return the cached entry for key, or None on a miss"""
+        cached = self._entries.get(key)
+        if cached is not None:
+            entry, expires = cached
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+            del self._entries[key]
+
+        collection = self._collection()
+        if collection is not None:
+            try:
+                doc = await collection.find_one(
+                    {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+                )
+            except PyMongoError as e:
+                print(f"Response cache lookup failed: {e}")
+                doc = None
+            if doc:
+                entry = {"response": doc["response"], "response_id": doc.get("response_id")}
+                self._remember(key, entry)
+                self.persistent_hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+    async def set(self, key, response, response_id=None, model=None):
+        """Store a response in both tiers"""
+        entry = {"response": response, "response_id": response_id}
+        self._remember(key, entry)
+
+        collection = self._collection()
+        if collection is None:
+            return
+        try:
+            await collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "response": response,
+                    "response_id": response_id,
+                    "model": model,
+                    "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl_seconds),
+                }},
+                upsert=True,
+            )
+        except PyMongoError as e:
+            print(f"Response cache write failed: {e}")
+
+    def stats(self):
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+response_cache = ResponseCache()
@@ -0,0 +1,162 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from src.db import get_database
+from src.llm_implementation import aprompt_llm
+from src.models import BatchPromptRequest
+from src.routes.llms import resolve_model
+from bson import ObjectId
+
+router = APIRouter(prefix="/prompt/batch")
+
+BATCH_MAX_PARALLELISM = int(os.getenv("BATCH_MAX_PARALLELISM", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+# Number of finished items written to the responses collection at once
+BATCH_FLUSH_SIZE = 50
+
+async def _flush(batch_id, responses, errors):
+    """Bulk insert finished items and record progress on the batch"""
+    db = get_database()
+    if responses:
+        await db.get_collection("responses").insert_many(responses)
+    await db.get_collection("message_batches").update_one(
+        {"_id": batch_id},
+        {
+            "$inc": {"completed": len(responses), "failed": len(errors)},
+            "$push": {"errors": {"$each": errors}},
+        },
+    )
+
+async def run_batch(batch_id, items, parallelism, model):
+    """Run every item of a batch against the LLM, at most parallelism at a time"""
+    lock = asyncio.Lock()
+    pending = {"responses": [], "errors": []}
+
+    async def take_pending():
+        async with lock:
+            taken = pending["responses"], pending["errors"]
+            pending["responses"], pending["errors"] = [], []
+        return taken
+
+    async def run_item(index, item):
+        async with semaphore:
+            try:
+                item_model = item.get("model") or model
+                response = await aprompt_llm(item["user_message"], item["system_message"], item_model)
+                result = {
+                    "system_message": item["system_message"],
+                    "user_message": item["user_message"],
+                    "model": item_model,
+                    "response": response.content,
+                    "batch_id": str(batch_id),
+                    "batch_index": index,
+                }
+                key = "responses"
+            except Exception as e:
+                result = {"index": index, "error": str(e)}
+                key = "errors"
+
+        async with lock:
+            pending[key].append(result)
+            full = len(pending["responses"]) + len(pending["errors"]) >= BATCH_FLUSH_SIZE
+        if full:
+            await _flush(batch_id, *await take_pending())
+
+    batches = get_database().get_collection("message_batches")
+    # Any failure, setup included, must leave the batch failed rather than pending
+    try:
+        semaphore = asyncio.Semaphore(parallelism)
+        await batches.update_one({"_id": batch_id}, {"$set": {"status": "running"}})
+        await asyncio.gather(*(run_item(index, item) for index, item in enumerate(items)))
+        await _flush(batch_id, *await take_pending())
+        status = "completed"
+    except Exception as e:
+        print(f"Batch {batch_id} failed: {e}")
+        status = "failed"
+    await batches.update_one(
+        {"_id": batch_id},
+        {"$set": {"status": status, "finished_at": datetime.now(timezone.utc)}},
+    )
+
+def _batch_summary(batch):
+    return {
+        "batch_id": str(batch["_id"]),
+        "status": batch["status"],
+        "total": batch["total"],
+        "completed": batch.get("completed", 0),
+        "failed": batch.get("failed", 0),
+    }
+
+# Submit a batch of prompts
+@router.post("", status_code=202)
+async def create_batch(req: BatchPromptRequest, background_tasks: BackgroundTasks):
+    if not req.items:
+        raise HTTPException(status_code=400, detail="Batch has no items")
+    if len(req.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch exceeds {BATCH_MAX_ITEMS} items")
+
+    model = await resolve_model(req.model)
+    if not model:
+        raise HTTPException(status_code=400, detail="No LLM model selected")
+    parallelism = min(req.parallelism or BATCH_MAX_PARALLELISM, BATCH_MAX_PARALLELISM)
+
+    # Items that name a model run on it, the others on the batch model
+    item_models = {}
+    for name in {item.model for item in req.items if item.model}:
+        item_models[name] = await resolve_model(name)
+    items = []
+    for item in req.items:
+        data = item.model_dump(exclude={"model"})
+        if item.model:
+            data["model"] = item_models[item.model]
+        items.append(data)
+    batch = {
+        "status": "pending",
+        "model": model,
+        "parallelism": parallelism,
+        "total": len(items),
+        "completed": 0,
+        "failed": 0,
+        "errors": [],
+        "items": items,
+        "created_at": datetime.now(timezone.utc),
+    }
+    db = get_database()
+    result = await db.get_collection("message_batches").insert_one(batch)
+    batch["_id"] = result.inserted_id
+
+    background_tasks.add_task(run_batch, result.inserted_id, items, parallelism, model)
+    return _batch_summary(batch)
+
+# Get the progress of a batch
+@router.get("/{batch_id}")
+async def get_batch(batch_id: str):
+    db = get_database()
+    batch = await db.get_collection("message_batches").find_one(
+        {"_id": ObjectId(batch_id)}, {"items": 0, "errors": 0}
+    )
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return _batch_summary(batch)
+
+# Get the per-item results of a batch
+@router.get("/{batch_id}/results")
+async def get_batch_results(batch_id: str):
+    db = get_database()
+    batch = await db.get_collection("message_batches").find_one(
+        {"_id": ObjectId(batch_id)}, {"items": 0}
+    )
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    responses = await db.get_collection("responses").find(
+        {"batch_id": batch_id}, {"batch_index": 1, "response": 1}
+    ).to_list()
+    results = [
+        {"index": doc["batch_index"], "response_id": str(doc["_id"]), "response": doc["response"]}
+        for doc in responses
+    ]
+    results.extend(batch.get("errors", []))
+    results.sort(key=lambda result: result["index"])
+    return {**_batch_summary(batch), "results": results}
@@ -0,0 +1,48 @@
+import asyncio
+import time
+from fastapi import APIRouter, HTTPException, Query
+from src.db import get_database
+from src.job_queue import JOBS_COLLECTION, JOB_POLL_SECONDS, enqueue_job
+from src.models import PromptRequest
+from src.routes.llms import resolve_model
+from bson import ObjectId
+
+router = APIRouter(prefix="/jobs")
+
+FINISHED_STATUSES = ("completed", "failed")
+
+# Submit a prompt to be run in the background
+@router.post("", status_code=202)
+async def submit_job(prompt: PromptRequest):
+    model = await resolve_model(prompt.model)
+    if not model:
+        raise HTTPException(status_code=400, detail="No LLM model selected")
+    job_id = await enqueue_job(prompt.system_message, prompt.user_message, model)
+    return {"job_id": str(job_id), "status": "queued"}
+
+# Get a job, optionally waiting up to `wait` seconds for it to finish
+@router.get("/{job_id}")
+async def get_job(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    db = get_database()
+    jobs = db.get_collection(JOBS_COLLECTION)
+    deadline = time.monotonic() + wait
+
+    while True:
+        job = await jobs.find_one({"_id": ObjectId(job_id)})
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        if job["status"] in FINISHED_STATUSES or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(JOB_POLL_SECONDS)
+
+    result = {
+        "job_id": job_id,
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "error": job.get("error"),
+        "response_id": job.get("response_id"),
+    }
+    if job.get("response_id"):
+        response = await db.get_collection("responses").find_one({"_id": ObjectId(job["response_id"])})
+        result["response"] = response["response"] if response else None
+    return result
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException, Body
-import requests
+from src.model_registry import model_registry, ModelRegistryError
 
 router = APIRouter(prefix="/llms")
 
@@ -12,33 +12,38 @@ def set_selected_llm(model_name: str):
     global _selected_llm
     _selected_llm = model_name
 
+async def resolve_model(requested=None):
+    """Return the requested model if Ollama serves it, otherwise the selected one"""
+    if not requested:
+        return get_current_selected_llm()
+    try:
+        llms_available = await model_registry.get_models()
+    except ModelRegistryError:
+        # Let Ollama decide when the model list cannot be checked
+        return requested
+    if requested not in llms_available:
+        raise HTTPException(status_code=400, detail="Model not available")
+    return requested
+
 @router.get("/")
 async def get_available_llms():
     try:
-        response = requests.get("http://host.docker.internal:11434/api/tags")
-        response.raise_for_status()
-        data = response.json()
-        
-        llms_available = data.get("models", [])
-        
-        return {"llms": [{"name": llm["name"], "status": "available"} for llm in llms_available]}
-    except requests.exceptions.RequestException as e:
+        llms_available = await model_registry.get_models()
+    except ModelRegistryError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch models: {str(e)}")
 
+    return {"llms": [{"name": name, "status": "available"} for name in llms_available]}
+
 @router.post("/select")
 async def select_llm(model_name: str = Body(..., embed=True)):
     try:
-        response = requests.get("http://host.docker.internal:11434/api/tags")
-        response.raise_for_status()
-        data = response.json()
-        
-        llms_available = [model["name"] for model in data.get("models", [])]
-    except requests.exceptions.RequestException as e:
+        llms_available = await model_registry.get_models()
+    except ModelRegistryError as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch models: {str(e)}")
 
     if model_name not in llms_available:
         raise HTTPException(status_code=400, detail="Model not available")
-    
+
     set_selected_llm(model_name)
     return {"message": f"Selected model set to {model_name}"}
 
@@ -47,4 +52,4 @@ async def get_selected_llm_endpoint():
     current_llm = get_current_selected_llm()
     if not current_llm:
         raise HTTPException(status_code=404, detail="No model selected")
-    return {"selected_llm": current_llm}
\ No newline at end of file
+    return {"selected_llm": current_llm}
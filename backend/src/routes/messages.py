@@ -1,6 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Response
 from src.models import MessageRequest
 from src.db import get_database
+from src.pagination import page_params, paginate
 from bson import ObjectId
 
 router = APIRouter(prefix="/messages")
@@ -11,48 +12,38 @@ async def save_user_message(req: MessageRequest):
     db = get_database()
     print("Connected to DB:", db.name)
     user_messages = db.get_collection("user_messages")
-    user_messages.insert_one({"message": req.message})
+    await user_messages.insert_one({"message": req.message})
     return "User message saved"
 
 @router.post("/system")
 async def save_system_message(req: MessageRequest):
     db = get_database()
     system_messages = db.get_collection("system_messages")
-    result = system_messages.insert_one({"message": req.message})
+    result = await system_messages.insert_one({"message": req.message})
     print(f"Inserted document ID: {result.inserted_id}")
     return "System message saved"
 
-# List all user messages -------
+# List a page of user messages -------
 @router.get("/user")
-async def list_user_messages():
+async def list_user_messages(response: Response, page: dict = Depends(page_params)):
     db = get_database()
-    
-    user_messages = db["user_messages"]
-    items = list(user_messages.find())
-    
-    for item in items:
-        item["_id"] = str(item["_id"])
-    
-    return items
+    user_messages = db.get_collection("user_messages")
+    return await paginate(user_messages, response, **page)
 
-# List all system messages --------------
+# List a page of system messages --------------
 @router.get("/system")
-async def list_system_messages():
+async def list_system_messages(response: Response, page: dict = Depends(page_params)):
     db = get_database()
-    system_messages = db["system_messages"]
-    items = list(system_messages.find())
-    
-    for item in items:
-        item["_id"] = str(item["_id"])
-    return items
+    system_messages = db.get_collection("system_messages")
+    return await paginate(system_messages, response, **page)
 
 
 # Retrieve a user message
 @router.get("/user/{message_id}")
 async def get_user_message(message_id: str):
     db = get_database()
-    user_messages = db["user_messages"]
-    message = user_messages.find_one({"_id": ObjectId(message_id)})
+    user_messages = db.get_collection("user_messages")
+    message = await user_messages.find_one({"_id": ObjectId(message_id)})
     
     if message:
         message["_id"] = str(message["_id"])
@@ -63,8 +54,8 @@ async def get_user_message(message_id: str):
 @router.get("/system/{message_id}")
 async def get_system_message(message_id: str):
     db = get_database()
-    system_messages = db["system_messages"]
-    message = system_messages.find_one({"_id": ObjectId(message_id)})
+    system_messages = db.get_collection("system_messages")
+    message = await system_messages.find_one({"_id": ObjectId(message_id)})
     
     if message:
         message["_id"] = str(message["_id"])
@@ -75,8 +66,8 @@ async def get_system_message(message_id: str):
 @router.delete("/user/{message_id}")
 async def delete_user_message(message_id: str):
     db = get_database()
-    user_messages = db["user_messages"]
-    result = user_messages.delete_one({"_id": ObjectId(message_id)})
+    user_messages = db.get_collection("user_messages")
+    result = await user_messages.delete_one({"_id": ObjectId(message_id)})
     
     if result.deleted_count == 1:
         return {"message": f"User message {message_id} deleted"}
@@ -86,8 +77,8 @@ async def delete_user_message(message_id: str):
 @router.delete("/system/{message_id}")
 async def delete_system_message(message_id: str):
     db = get_database()
-    system_messages = db["system_messages"]
-    result = system_messages.delete_one({"_id": ObjectId(message_id)})
+    system_messages = db.get_collection("system_messages")
+    result = await system_messages.delete_one({"_id": ObjectId(message_id)})
     
     if result.deleted_count == 1:
         return {"message": f"System message {message_id} deleted"}
@@ -1,27 +1,94 @@
-from fastapi import APIRouter, HTTPException
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from src.db import get_database
+from src.pagination import page_params, paginate
 from bson import ObjectId
 
 router = APIRouter(prefix="/responses")
 
-# Get all responses
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = ["_id", "created_at", "model", "system_message", "user_message", "response"]
+
+# Get a page of responses
 @router.get("/")
-async def list_responses():
+async def list_responses(response: Response, page: dict = Depends(page_params)):
     db = get_database()
     responses_collection = db.get_collection("responses")
-    responses = list(responses_collection.find())
-    
-    for response in responses:
-        response["_id"] = str(response["_id"])
-    
-    return responses
+    return await paginate(responses_collection, response, **page)
+
+def _export_row(doc):
+    """Flatten a response document into the exported columns"""
+    return {
+        "_id": str(doc["_id"]),
+        "created_at": doc["_id"].generation_time.isoformat(),
+        "model": doc.get("model"),
+        "system_message": doc.get("system_message"),
+        "user_message": doc.get("user_message"),
+        "response": doc.get("response"),
+    }
+
+async def _export_ndjson(cursor):
+    async for doc in cursor:
+        yield json.dumps(_export_row(doc)) + "\n"
+
+async def _export_csv(cursor):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    async for doc in cursor:
+        writer.writerow(_export_row(doc))
+        # Only one row is buffered at a time, so memory stays constant
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+# Stream every matching response as NDJSON or CSV
+@router.get("/export")
+async def export_responses(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    model: Optional[str] = None,
+):
+    query = {}
+    # The creation time is part of the ObjectId, so date ranges are _id ranges
+    if start or end:
+        query["_id"] = {}
+        if start:
+            query["_id"]["$gte"] = ObjectId.from_datetime(start)
+        if end:
+            query["_id"]["$lt"] = ObjectId.from_datetime(end)
+    if model:
+        query["model"] = model
+
+    db = get_database()
+    responses_collection = db.get_collection("responses")
+    cursor = responses_collection.find(query).sort("_id", 1).batch_size(EXPORT_BATCH_SIZE)
+
+    if format == "csv":
+        return StreamingResponse(
+            _export_csv(cursor),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=responses.csv"},
+        )
+    return StreamingResponse(
+        _export_ndjson(cursor),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=responses.ndjson"},
+    )
 
 # Get a response
 @router.get("/{response_id}")
 async def get_response(response_id: str):
     db = get_database()
     responses_collection = db.get_collection("responses")
-    response = responses_collection.find_one({"_id": ObjectId(response_id)})
+    response = await responses_collection.find_one({"_id": ObjectId(response_id)})
     
     if response:
         response["_id"] = str(response["_id"])
@@ -33,7 +100,7 @@ async def get_response(response_id: str):
 async def delete_response(response_id: str):
     db = get_database()
     responses_collection = db.get_collection("responses")
-    result = responses_collection.delete_one({"_id": ObjectId(response_id)})
+    result = await responses_collection.delete_one({"_id": ObjectId(response_id)})
     
     if result.deleted_count == 1:
         return {"message": f"Response {response_id} deleted"}
@@ -0,0 +1,179 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+from bson import ObjectId
+import pytest
+from src.routes import batches
+from src.routes.batches import router
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+FAKE_ID = ObjectId()
+
+
+@pytest.fixture
+def mock_db():
+    """
+    Fixture to patch get_database in the batches router and return a mocked DB instance.
+    """
+    with patch("src.routes.batches.get_database") as mock_get_db:
+        mock_db = MagicMock()
+        mock_db.get_collection.return_value = MagicMock(
+            insert_one=AsyncMock(), insert_many=AsyncMock(), update_one=AsyncMock(), find_one=AsyncMock()
+        )
+        mock_get_db.return_value = mock_db
+        yield mock_db
+
+
+@patch("src.routes.batches.resolve_model", new_callable=AsyncMock, return_value="llama2")
+@patch("src.routes.batches.run_batch", new_callable=AsyncMock)
+def test_create_batch_stores_batch_and_schedules_run(mock_run_batch, mock_get_llm, mock_db):
+    """
+    Test that POST /prompt/batch stores the batch and schedules it with a capped parallelism.
+    """
+    mock_db.get_collection.return_value.insert_one.return_value.inserted_id = FAKE_ID
+    items = [{"system_message": "S", "user_message": f"U{i}"} for i in range(3)]
+
+    response = client.post("/prompt/batch", json={"items": items, "parallelism": 1000})
+
+    assert response.status_code == 202
+    assert response.json() == {
+        "batch_id": str(FAKE_ID), "status": "pending", "total": 3, "completed": 0, "failed": 0
+    }
+    stored = mock_db.get_collection.return_value.insert_one.call_args[0][0]
+    assert stored["items"] == items
+    mock_run_batch.assert_awaited_once_with(FAKE_ID, items, batches.BATCH_MAX_PARALLELISM, "llama2")
+
+
+@patch("src.routes.batches.resolve_model", new_callable=AsyncMock, side_effect=lambda name=None: name or "llama2")
+@patch("src.routes.batches.run_batch", new_callable=AsyncMock)
+def test_create_batch_keeps_per_item_models(mock_run_batch, mock_resolve_model, mock_db):
+    """
+    Test that an item naming a model is resolved and stored with it, while the others use the batch model.
+    """
+    mock_db.get_collection.return_value.insert_one.return_value.inserted_id = FAKE_ID
+    items = [
+        {"system_message": "S", "user_message": "U0", "model": "mistral"},
+        {"system_message": "S", "user_message": "U1"},
+        {"system_message": "S", "user_message": "U2", "model": "mistral"},
+    ]
+
+    response = client.post("/prompt/batch", json={"items": items})
+
+    assert response.status_code == 202
+    stored = mock_db.get_collection.return_value.insert_one.call_args[0][0]["items"]
+    assert [item.get("model") for item in stored] == ["mistral", None, "mistral"]
+    assert mock_resolve_model.await_count == 2
+
+
+@patch("src.routes.batches.resolve_model", new_callable=AsyncMock)
+def test_create_batch_rejects_unavailable_item_model(mock_resolve_model, mock_db):
+    """
+    Test that a batch with an item naming a model Ollama does not serve is rejected with 400.
+    """
+    from fastapi import HTTPException
+
+    async def resolve(name=None):
+        if name == "missing":
+            raise HTTPException(status_code=400, detail="Model not available")
+        return "llama2"
+    mock_resolve_model.side_effect = resolve
+
+    response = client.post("/prompt/batch", json={"items": [{"system_message": "S", "user_message": "U", "model": "missing"}]})
+
+    assert response.status_code == 400
+    mock_db.get_collection.return_value.insert_one.assert_not_called()
+
+
+@patch("src.routes.batches.aprompt_llm")
+def test_run_batch_runs_items_on_their_own_model(mock_aprompt_llm, mock_db):
+    """
+    Test that run_batch sends an item with its own model to that model.
+    """
+    mock_aprompt_llm.return_value = MagicMock(content="ok")
+    items = [{"system_message": "S", "user_message": "U0", "model": "mistral"}, {"system_message": "S", "user_message": "U1"}]
+
+    asyncio.run(batches.run_batch(FAKE_ID, items, 2, "llama2"))
+
+    models = sorted(call.args[2] for call in mock_aprompt_llm.call_args_list)
+    assert models == ["llama2", "mistral"]
+    stored = mock_db.get_collection.return_value.insert_many.call_args[0][0]
+    assert sorted(doc["model"] for doc in stored) == ["llama2", "mistral"]
+
+
+def test_create_batch_rejects_empty_batch(mock_db):
+    """
+    Test that an empty batch is rejected.
+    """
+    response = client.post("/prompt/batch", json={"items": []})
+    assert response.status_code == 400
+
+
+@patch("src.routes.batches.aprompt_llm")
+def test_run_batch_bulk_inserts_results_and_records_errors(mock_aprompt_llm, mock_db):
+    """
+    Test that run_batch respects the parallelism cap, bulk inserts responses and records failures.
+    """
+    running = {"now": 0, "max": 0}
+
+    async def fake_aprompt_llm(query, system_message, model):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        if query == "bad":
+            raise RuntimeError("generation failed")
+        return MagicMock(content=f"answer to {query}")
+
+    mock_aprompt_llm.side_effect = fake_aprompt_llm
+    items = [{"system_message": "S", "user_message": q} for q in ["a", "bad", "c", "d"]]
+
+    asyncio.run(batches.run_batch(FAKE_ID, items, 2, "llama2"))
+
+    collection = mock_db.get_collection.return_value
+    assert running["max"] == 2
+    inserted = collection.insert_many.call_args[0][0]
+    assert sorted(doc["batch_index"] for doc in inserted) == [0, 2, 3]
+    assert all(doc["batch_id"] == str(FAKE_ID) for doc in inserted)
+
+    progress = collection.update_one.call_args_list[1][0][1]
+    assert progress["$inc"] == {"completed": 3, "failed": 1}
+    assert progress["$push"]["errors"]["$each"] == [{"index": 1, "error": "generation failed"}]
+    assert collection.update_one.call_args_list[-1][0][1]["$set"]["status"] == "completed"
+
+
+@pytest.mark.parametrize("parallelism", [0, -1])
+@patch("src.routes.batches.run_batch", new_callable=AsyncMock)
+def test_create_batch_rejects_parallelism_below_one(mock_run_batch, mock_db, parallelism):
+    """
+    Test that a parallelism below 1 is rejected before the batch is stored.
+    """
+    items = [{"system_message": "S", "user_message": "U"}]
+    response = client.post("/prompt/batch", json={"items": items, "parallelism": parallelism})
+    assert response.status_code == 422
+    mock_db.get_collection.return_value.insert_one.assert_not_awaited()
+    mock_run_batch.assert_not_awaited()
+
+
+def test_run_batch_marks_setup_failure_as_failed(mock_db):
+    """
+    Test that run_batch marks the batch failed when it cannot even start.
+    """
+    items = [{"system_message": "S", "user_message": "U"}]
+
+    asyncio.run(batches.run_batch(FAKE_ID, items, -1, "llama2"))
+
+    update = mock_db.get_collection.return_value.update_one.call_args[0][1]
+    assert update["$set"]["status"] == "failed"
+
+
+def test_get_batch_not_found(mock_db):
+    """
+    Test that GET /prompt/batch/{id} returns 404 for an unknown batch.
+    """
+    mock_db.get_collection.return_value.find_one.return_value = None
+    response = client.get(f"/prompt/batch/{FAKE_ID}")
+    assert response.status_code == 404
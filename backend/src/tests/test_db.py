@@ -1,7 +1,9 @@
 import sys
+import asyncio
 import importlib.util
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+import pytest
 
 db_path = Path(__file__).resolve().parents[2] / "src" / "db.py"
 spec = importlib.util.spec_from_file_location("db", db_path)
@@ -10,52 +12,67 @@ sys.modules["db"] = db
 spec.loader.exec_module(db)
 
 
-@patch("db.MongoClient")
+@pytest.fixture(autouse=True)
+def fresh_client():
+    """
+    Fixture that keeps the shared client of one test out of the next.
+    """
+    db._client = None
+    yield
+    db._client = None
+
+
+@patch("db.AsyncMongoClient")
 def test_init_db_success(mock_mongo_client):
     """
     Test that init_db() successfully initializes MongoDB client and database,
     calls the 'ping' command, and creates collections.
     """
     mock_client = MagicMock()
-    mock_db = MagicMock()
+    mock_client.admin.command = AsyncMock()
+    mock_db = AsyncMock()
 
     mock_mongo_client.return_value = mock_client
     mock_client.__getitem__.return_value = mock_db
     mock_db.list_collection_names.return_value = []
+    mock_db.get_collection = MagicMock(return_value=MagicMock(create_indexes=AsyncMock()))
 
-    client, db_obj = db.init_db()
+    client, db_obj = asyncio.run(db.init_db())
 
     assert client == mock_client
     assert db_obj == mock_db
-    mock_client.admin.command.assert_called_once_with("ping")
-    assert mock_db.create_collection.call_count == 3
+    mock_client.admin.command.assert_awaited_once_with("ping")
+    assert mock_db.create_collection.await_count == 3
+    assert mock_db.get_collection.return_value.create_indexes.await_count == 5
+    mock_client.__getitem__.assert_called_once_with("mydb")
 
 
-@patch("db.MongoClient", side_effect=Exception("Connection error"))
+@patch("db.AsyncMongoClient", side_effect=Exception("Connection error"))
 def test_init_db_failure(mock_mongo_client):
     """
     Test that init_db() handles MongoDB connection failure and returns (None, None).
     """
-    client, db_obj = db.init_db()
+    client, db_obj = asyncio.run(db.init_db())
     assert client is None
     assert db_obj is None
 
 
-@patch.object(db, 'db')
+@patch.object(db, 'db', new_callable=AsyncMock)
 def test_create_collections_creates_missing(mock_db):
     """
     Test that create_collections() creates collections that do not already exist.
     """
     mock_db.list_collection_names.return_value = ["user_messages"]
 
-    db.create_collections()
+    asyncio.run(db.create_collections())
 
     mock_db.create_collection.assert_any_call("system_messages")
     mock_db.create_collection.assert_any_call("responses")
     assert mock_db.create_collection.call_count == 2
+    mock_db.list_collection_names.assert_awaited_once()
 
 
-@patch.object(db, 'db')
+@patch.object(db, 'db', new_callable=AsyncMock)
 def test_create_collections_all_exist(mock_db):
     """
     Test that create_collections() does not create any collections if they already exist.
@@ -64,11 +81,104 @@ def test_create_collections_all_exist(mock_db):
         "user_messages", "system_messages", "responses"
     ]
 
-    db.create_collections()
+    asyncio.run(db.create_collections())
 
     mock_db.create_collection.assert_not_called()
 
 
+@patch.object(db, 'db', new_callable=MagicMock)
+def test_create_indexes_builds_declared_indexes(mock_db):
+    """
+    Test that create_indexes() builds the declared indexes of each collection
+    and skips collections without any.
+    """
+    collections = {}
+    mock_db.get_collection.side_effect = lambda name: collections.setdefault(name, MagicMock(create_indexes=AsyncMock()))
+
+    asyncio.run(db.create_indexes())
+
+    assert set(collections) == {"responses", "message_batches", "response_cache", "prompt_jobs", "sonar_issues"}
+    names = [index.document["name"] for index in collections["responses"].create_indexes.await_args.args[0]]
+    assert names == ["batch_id_batch_index", "model_id"]
+    ttl = collections["response_cache"].create_indexes.await_args.args[0][0].document
+    assert ttl["name"] == "expires_at_1"
+    assert ttl["expireAfterSeconds"] == 0
+    jobs = [index.document["name"] for index in collections["prompt_jobs"].create_indexes.await_args.args[0]]
+    assert jobs == ["status_1_available_at_1", "status_1_lease_until_1"]
+
+
+@patch.object(db, 'db', new_callable=MagicMock)
+def test_create_indexes_continues_after_a_failure(mock_db):
+    """
+    Test that create_indexes() reports a collection whose indexes conflict and
+    builds the others.
+    """
+    failing = MagicMock(create_indexes=AsyncMock(side_effect=db.PyMongoError("IndexKeySpecsConflict")))
+    working = MagicMock(create_indexes=AsyncMock())
+    mock_db.get_collection.side_effect = lambda name: failing if name == "responses" else working
+
+    asyncio.run(db.create_indexes())
+
+    indexed = [name for name, indexes in db.INDEXES.items() if indexes]
+    assert working.create_indexes.await_count == len(indexed) - 1
+
+
+@patch("db.AsyncMongoClient")
+def test_get_client_is_created_once_from_settings(mock_mongo_client):
+    """
+    Test that get_client() creates one lazily connecting client configured
+    from the environment and returns it on every call.
+    """
+    client = db.get_client()
+
+    assert db.get_client() is client
+    mock_mongo_client.assert_called_once()
+    args, kwargs = mock_mongo_client.call_args
+    assert args == (db.MONGO_URI,)
+    assert kwargs["connect"] is False
+    assert kwargs["maxPoolSize"] == db.MONGO_MAX_POOL_SIZE
+    assert kwargs["event_listeners"] == [db.pool_stats]
+
+
+@patch("db.AsyncMongoClient")
+def test_close_client_lets_the_next_call_create_a_client(mock_mongo_client):
+    """
+    Test that close_client() closes the shared client and forgets it.
+    """
+    mock_mongo_client.return_value.close = AsyncMock()
+    db.get_client()
+
+    asyncio.run(db.close_client())
+
+    mock_mongo_client.return_value.close.assert_awaited_once()
+    assert db.get_database() is None
+    db.get_client()
+    assert mock_mongo_client.call_count == 2
+
+
+def test_pool_stats_counts_connections_in_use():
+    """
+    Test that PoolStats tracks open and checked out connections from pool events.
+    """
+    stats = db.PoolStats()
+    for _ in range(3):
+        stats.connection_created(None)
+    stats.connection_checked_out(None)
+    stats.connection_checked_out(None)
+    stats.connection_checked_in(None)
+    stats.connection_closed(None)
+    stats.connection_check_out_failed(None)
+
+    result = stats.stats()
+
+    assert result["open"] == 2
+    assert result["in_use"] == 1
+    assert result["available"] == 1
+    assert result["checkouts"] == 2
+    assert result["checkout_failures"] == 1
+    assert result["max_pool_size"] == db.MONGO_MAX_POOL_SIZE
+
+
 def test_get_database_returns_global_db():
     """
     Test that get_database() returns the global db object.
@@ -0,0 +1,117 @@
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+from bson import ObjectId
+import pytest
+from src import job_queue
+from src.routes.jobs import router
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+JOB_ID = ObjectId()
+
+
+@pytest.fixture
+def mock_db():
+    """
+    Fixture to patch get_database in the job queue and jobs router.
+    """
+    with patch("src.job_queue.get_database") as mock_get_db, \
+            patch("src.routes.jobs.get_database", new=mock_get_db):
+        mock_db = MagicMock()
+        mock_db.get_collection.return_value = MagicMock(
+            insert_one=AsyncMock(), update_one=AsyncMock(),
+            find_one=AsyncMock(), find_one_and_update=AsyncMock()
+        )
+        mock_get_db.return_value = mock_db
+        yield mock_db
+
+
+def make_job(attempts=1, max_attempts=3):
+    return {
+        "_id": JOB_ID, "status": "running", "system_message": "S", "user_message": "U", "model": "llama2",
+        "attempts": attempts, "max_attempts": max_attempts,
+    }
+
+
+@patch("src.routes.jobs.resolve_model", new_callable=AsyncMock, return_value="llama2")
+def test_submit_job_returns_job_id(mock_resolve_model, mock_db):
+    """
+    Test that POST /jobs persists a queued job and returns its id immediately.
+    """
+    mock_db.get_collection.return_value.insert_one.return_value.inserted_id = JOB_ID
+
+    response = client.post("/jobs", json={"system_message": "S", "user_message": "U"})
+
+    assert response.status_code == 202
+    assert response.json() == {"job_id": str(JOB_ID), "status": "queued"}
+    stored = mock_db.get_collection.return_value.insert_one.call_args[0][0]
+    assert stored["status"] == "queued"
+    assert stored["model"] == "llama2"
+    assert stored["attempts"] == 0
+
+
+def test_claim_job_takes_queued_or_expired_jobs(mock_db):
+    """
+    Test that claim_job atomically leases queued jobs and jobs whose lease has expired.
+    """
+    asyncio.run(job_queue.claim_job("worker-1"))
+
+    query, update = mock_db.get_collection.return_value.find_one_and_update.call_args[0]
+    statuses = [condition["status"] for condition in query["$or"]]
+    assert statuses == ["queued", "running"]
+    assert update["$set"]["worker_id"] == "worker-1"
+    assert update["$inc"] == {"attempts": 1}
+
+
+@patch("src.job_queue.aprompt_llm", new_callable=AsyncMock)
+def test_process_job_stores_response(mock_aprompt_llm, mock_db):
+    """
+    Test that a successful job stores its response and is marked completed.
+    """
+    mock_aprompt_llm.return_value = MagicMock(content="Answer")
+    collection = mock_db.get_collection.return_value
+    collection.insert_one.return_value.inserted_id = "resp1"
+
+    asyncio.run(job_queue.process_job(make_job(), "worker-1"))
+
+    mock_aprompt_llm.assert_awaited_once_with("U", "S", "llama2")
+    assert collection.insert_one.call_args[0][0]["job_id"] == str(JOB_ID)
+    update = collection.update_one.call_args[0][1]["$set"]
+    assert update["status"] == "completed"
+    assert update["response_id"] == "resp1"
+
+
+@patch("src.job_queue.aprompt_llm", new_callable=AsyncMock, side_effect=RuntimeError("Ollama down"))
+def test_process_job_requeues_then_fails(mock_aprompt_llm, mock_db):
+    """
+    Test that a failed job is requeued until it runs out of attempts.
+    """
+    collection = mock_db.get_collection.return_value
+
+    asyncio.run(job_queue.process_job(make_job(attempts=1), "worker-1"))
+    assert collection.update_one.call_args[0][1]["$set"]["status"] == "queued"
+
+    asyncio.run(job_queue.process_job(make_job(attempts=3), "worker-1"))
+    assert collection.update_one.call_args[0][1]["$set"] == {"status": "failed", "error": "Ollama down"}
+
+
+def test_get_job_returns_response_when_completed(mock_db):
+    """
+    Test that GET /jobs/{id} includes the stored response of a completed job.
+    """
+    response_id = ObjectId()
+    collection = mock_db.get_collection.return_value
+    collection.find_one.side_effect = [
+        {**make_job(), "status": "completed", "response_id": str(response_id)},
+        {"_id": response_id, "response": "Answer"},
+    ]
+
+    response = client.get(f"/jobs/{JOB_ID}?wait=5")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.json()["response"] == "Answer"
@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from bson import ObjectId
 import pytest
 from src.routes.messages import router
@@ -21,6 +21,10 @@ def mock_db():
     """
     with patch("src.routes.messages.get_database") as mock_get_db: 
         mock_db = MagicMock()
+        mock_db.get_collection.return_value = MagicMock(
+            insert_one=AsyncMock(), find_one=AsyncMock(), delete_one=AsyncMock(),
+            estimated_document_count=AsyncMock(return_value=1)
+        )
         mock_get_db.return_value = mock_db
         yield mock_db
 
@@ -29,7 +33,7 @@ def test_save_user_message(mock_db):
     """
     Test saving a user message successfully.
     """
-    mock_collection = MagicMock()
+    mock_collection = MagicMock(insert_one=AsyncMock())
     mock_db.get_collection.return_value = mock_collection
 
     response = client.post("/messages/user", json={"message": "Hello!"})
@@ -41,7 +45,7 @@ def test_save_system_message(mock_db):
     """
     Test saving a system message successfully.
     """
-    mock_collection = MagicMock()
+    mock_collection = MagicMock(insert_one=AsyncMock())
     mock_collection.insert_one.return_value.inserted_id = FAKE_ID
     mock_db.get_collection.return_value = mock_collection
 
@@ -55,7 +59,9 @@ def test_list_user_messages(mock_db):
     Test listing user messages with mocked documents.
     """
     mock_cursor = [{"_id": ObjectId(), "message": "User 1"}]
-    mock_db.get_collection.return_value.find.return_value = mock_cursor
+    mock_db.get_collection.return_value.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+        return_value=mock_cursor
+    )
 
     response = client.get("/messages/user")
     assert response.status_code == 200
@@ -67,7 +73,9 @@ def test_list_system_messages(mock_db):
     Test listing system messages with mocked documents.
     """
     mock_cursor = [{"_id": ObjectId(), "message": "System 1"}]
-    mock_db.get_collection.return_value.find.return_value = mock_cursor
+    mock_db.get_collection.return_value.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+        return_value=mock_cursor
+    )
 
     response = client.get("/messages/system")
     assert response.status_code == 200
@@ -1,11 +1,11 @@
 import sys
+import asyncio
 import importlib.util
 from pathlib import Path
-import requests
 import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
 llms_path = Path(__file__).resolve().parents[2] / "src" / "routes" / "llms.py"
 spec = importlib.util.spec_from_file_location("llms_module", llms_path)
@@ -18,17 +18,12 @@ app.include_router(llms_module.router)
 client = TestClient(app)
 
 
-@patch("llms_module.requests.get")
-def test_get_available_llms_success(mock_requests_get):
+@patch.object(llms_module.model_registry, "get_models", new_callable=AsyncMock)
+def test_get_available_llms_success(mock_get_models):
     """
     Test that /llms/ returns a list of available models when the request succeeds.
     """
-    mock_response = MagicMock()
-    mock_response.raise_for_status.return_value = None
-    mock_response.json.return_value = {
-        "models": [{"name": "llama2"}, {"name": "mistral"}]
-    }
-    mock_requests_get.return_value = mock_response
+    mock_get_models.return_value = ["llama2", "mistral"]
 
     response = client.get("/llms/")
     assert response.status_code == 200
@@ -40,8 +35,9 @@ def test_get_available_llms_success(mock_requests_get):
     }
 
 
-@patch("llms_module.requests.get", side_effect=requests.exceptions.RequestException("Connection failed"))
-def test_get_available_llms_failure(mock_requests_get):
+@patch.object(llms_module.model_registry, "get_models", new_callable=AsyncMock,
+              side_effect=llms_module.ModelRegistryError("Connection failed"))
+def test_get_available_llms_failure(mock_get_models):
     """
     Test that /llms/ returns 500 if fetching models from Ollama fails.
     """
@@ -50,17 +46,12 @@ def test_get_available_llms_failure(mock_requests_get):
     assert "Failed to fetch models" in response.json()["detail"]
 
 
-@patch("llms_module.requests.get")
-def test_select_llm_success(mock_requests_get):
+@patch.object(llms_module.model_registry, "get_models", new_callable=AsyncMock)
+def test_select_llm_success(mock_get_models):
     """
     Test that /llms/select sets the selected model if it's available.
     """
-    mock_response = MagicMock()
-    mock_response.raise_for_status.return_value = None
-    mock_response.json.return_value = {
-        "models": [{"name": "llama2"}, {"name": "mistral"}]
-    }
-    mock_requests_get.return_value = mock_response
+    mock_get_models.return_value = ["llama2", "mistral"]
 
     response = client.post("/llms/select", json={"model_name": "llama2"})
     assert response.status_code == 200
@@ -68,25 +59,21 @@ def test_select_llm_success(mock_requests_get):
     assert llms_module.get_current_selected_llm() == "llama2"
 
 
-@patch("llms_module.requests.get")
-def test_select_llm_invalid_model(mock_requests_get):
+@patch.object(llms_module.model_registry, "get_models", new_callable=AsyncMock)
+def test_select_llm_invalid_model(mock_get_models):
     """
     Test that /llms/select returns 400 if the model name is not in the list.
     """
-    mock_response = MagicMock()
-    mock_response.raise_for_status.return_value = None
-    mock_response.json.return_value = {
-        "models": [{"name": "llama2"}]
-    }
-    mock_requests_get.return_value = mock_response
+    mock_get_models.return_value = ["llama2"]
 
     response = client.post("/llms/select", json={"model_name": "unknown"})
     assert response.status_code == 400
     assert response.json()["detail"] == "Model not available"
 
 
-@patch("llms_module.requests.get", side_effect=requests.exceptions.RequestException("API error"))
-def test_select_llm_api_failure(mock_requests_get):
+@patch.object(llms_module.model_registry, "get_models", new_callable=AsyncMock,
+              side_effect=llms_module.ModelRegistryError("API error"))
+def test_select_llm_api_failure(mock_get_models):
     """
     Test that /llms/select returns 500 if fetching model list fails.
     """
@@ -113,3 +100,17 @@ def test_get_selected_llm_endpoint_not_set():
     response = client.get("/llms/selected")
     assert response.status_code == 404
     assert response.json()["detail"] == "No model selected"
+
+
+@patch.object(llms_module.model_registry, "get_models", new_callable=AsyncMock, return_value=["llama2"])
+def test_resolve_model_validates_override(mock_get_models):
+    """
+    Test that resolve_model() falls back to the selected model and rejects unknown overrides.
+    """
+    llms_module.set_selected_llm("llama2")
+
+    assert asyncio.run(llms_module.resolve_model()) == "llama2"
+    assert asyncio.run(llms_module.resolve_model("llama2")) == "llama2"
+    with pytest.raises(llms_module.HTTPException) as exc:
+        asyncio.run(llms_module.resolve_model("unknown"))
+    assert exc.value.status_code == 400
@@ -2,8 +2,11 @@
 import sys
 import importlib.util
 from pathlib import Path
-from unittest.mock import patch, MagicMock
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
 import pytest
+from fastapi.testclient import TestClient
+from src.main import app
 
 llm_path = Path(__file__).resolve().parents[2] / "src" / "llm_implementation.py"
 spec = importlib.util.spec_from_file_location("llm_module", llm_path)
@@ -32,6 +35,7 @@ def test_prompt_llm_creates_llm_instance_and_invokes(mock_chat_ollama, mock_get_
     Test that prompt_llm() creates a ChatOllama instance, formats the prompt,
     and calls invoke() with the formatted prompt.
     """
+    llm_module.llm_pool.clear()
     mock_get_llm.return_value = "llama2"
     mock_llm_instance = MagicMock()
     mock_llm_instance.model = "llama2"
@@ -54,7 +58,7 @@ def test_prompt_llm_reuses_llm_instance_if_same_model(mock_chat_ollama, mock_get
     """
     Test that prompt_llm() reuses the existing ChatOllama instance if the model is the same.
     """
-    llm_module.llm = None
+    llm_module.llm_pool.clear()
 
     mock_get_llm.return_value = "llama2"
 
@@ -76,3 +80,146 @@ def test_prompt_llm_reuses_llm_instance_if_same_model(mock_chat_ollama, mock_get
     assert response == "Reused instance response"
     mock_chat_ollama.assert_not_called()
     mock_llm_instance.invoke.assert_called_once()
+
+
+@patch("llm_module.get_current_selected_llm")
+@patch("llm_module.ChatOllama")
+def test_aprompt_llm_awaits_ainvoke(mock_chat_ollama, mock_get_llm):
+    """
+    Test that aprompt_llm() uses the async client and never calls the blocking invoke().
+    """
+    llm_module.llm_pool.clear()
+    mock_get_llm.return_value = "llama2"
+
+    mock_llm_instance = MagicMock()
+    mock_llm_instance.model = "llama2"
+    mock_llm_instance.ainvoke = AsyncMock(return_value="Async response")
+    mock_chat_ollama.return_value = mock_llm_instance
+
+    response = asyncio.run(llm_module.aprompt_llm("Hello", "You are helpful"))
+
+    assert response == "Async response"
+    mock_llm_instance.ainvoke.assert_awaited_once()
+    mock_llm_instance.invoke.assert_not_called()
+    assert "Hello" in mock_llm_instance.ainvoke.call_args[0][0]
+
+
+@patch("llm_module.get_current_selected_llm")
+@patch("llm_module.ChatOllama")
+def test_aprompt_llm_limits_concurrency(mock_chat_ollama, mock_get_llm):
+    """
+    Test that aprompt_llm() never runs more generations at once than the semaphore allows.
+    """
+    llm_module.llm_pool.clear()
+    mock_get_llm.return_value = "llama2"
+    running = {"now": 0, "max": 0}
+
+    async def fake_ainvoke(_):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return "ok"
+
+    mock_llm_instance = MagicMock()
+    mock_llm_instance.model = "llama2"
+    mock_llm_instance.ainvoke = fake_ainvoke
+    mock_chat_ollama.return_value = mock_llm_instance
+
+    async def run_many():
+        llm_module._llm_semaphore = asyncio.Semaphore(2)
+        return await asyncio.gather(*(llm_module.aprompt_llm(str(i), "System") for i in range(6)))
+
+    try:
+        results = asyncio.run(run_many())
+    finally:
+        llm_module._llm_semaphore = None
+
+    assert results == ["ok"] * 6
+    assert running["max"] == 2
+
+
+@patch("src.main.resolve_model", new_callable=AsyncMock, return_value="llama2")
+@patch("src.main.get_database")
+@patch("src.main.astream_llm")
+def test_prompt_stream_sends_tokens_and_stores_response(mock_astream_llm, mock_get_db, mock_get_llm):
+    """
+    Test that /prompt/stream forwards tokens as SSE events and stores the full response at the end.
+    """
+    async def fake_stream(query, system_message, model):
+        for token in ["Hel", "lo"]:
+            yield token
+
+    mock_astream_llm.side_effect = fake_stream
+    mock_collection = mock_get_db.return_value.get_collection.return_value
+    mock_collection.insert_one = AsyncMock()
+    mock_collection.insert_one.return_value.inserted_id = "abc123"
+
+    client = TestClient(app)
+    response = client.post("/prompt/stream", json={"system_message": "System", "user_message": "Hi"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert 'data: {"token": "Hel"}' in response.text
+    assert 'event: done\ndata: {"response_id": "abc123"}' in response.text
+    mock_collection.insert_one.assert_called_once_with(
+        {"system_message": "System", "user_message": "Hi", "model": "llama2", "response": "Hello"}
+    )
+
+
+@patch("src.main.resolve_model", new_callable=AsyncMock, return_value="llama2")
+@patch("src.main.get_database")
+@patch("src.main.aprompt_llm")
+@patch("src.main.response_cache")
+def test_prompt_cache_hit_skips_llm(mock_cache, mock_aprompt_llm, mock_get_db, mock_get_llm):
+    """
+    Test that /prompt answers from the cache without calling the LLM and records where the answer came from.
+    """
+    mock_cache.get = AsyncMock(return_value={"response": "Cached answer", "response_id": "orig123"})
+    mock_cache.set = AsyncMock()
+    mock_collection = mock_get_db.return_value.get_collection.return_value
+    mock_collection.insert_one = AsyncMock()
+    mock_collection.insert_one.return_value.inserted_id = "new456"
+
+    client = TestClient(app)
+    response = client.post("/prompt", json={"system_message": "System", "user_message": "Hi"})
+
+    assert response.status_code == 200
+    assert response.json()["response_id"] == "new456"
+    assert response.json()["response"]["content"] == "Cached answer"
+    mock_aprompt_llm.assert_not_called()
+    mock_cache.set.assert_not_called()
+    stored = mock_collection.insert_one.call_args[0][0]
+    assert stored["cached_from"] == "orig123"
+    assert stored["response"] == "Cached answer"
+
+
+@patch("llm_module.ChatOllama")
+def test_llm_client_pool_keeps_clients_per_model_and_evicts_lru(mock_chat_ollama):
+    """
+    Test that the pool reuses clients per model and drops the least recently used one when full.
+    """
+    mock_chat_ollama.side_effect = lambda model, base_url: MagicMock(model=model)
+    pool = llm_module.LLMClientPool(max_clients=2)
+
+    llama = pool.get("llama2")
+    mistral = pool.get("mistral")
+    assert pool.get("llama2") is llama
+    pool.get("phi3")
+
+    assert pool.get("llama2") is llama
+    assert pool.get("mistral") is not mistral
+    assert mock_chat_ollama.call_count == 4
+
+
+@patch("llm_module.get_current_selected_llm", return_value="llama2")
+@patch("llm_module.ChatOllama")
+def test_prompt_llm_uses_model_override(mock_chat_ollama, mock_get_llm):
+    """
+    Test that prompt_llm() uses the requested model instead of the selected one.
+    """
+    llm_module.llm_pool.clear()
+
+    llm_module.prompt_llm("Hello", "System", model="mistral")
+
+    mock_chat_ollama.assert_called_once_with(model="mistral", base_url=llm_module.OLLAMA_BASE_URL)
@@ -0,0 +1,72 @@
+import asyncio
+import httpx
+import pytest
+from src.model_registry import ModelRegistry, ModelRegistryError
+
+
+def make_registry(handler, ttl_seconds=30, max_stale_seconds=300):
+    """
+    Build a registry whose HTTP calls go to the given handler instead of Ollama.
+    """
+    return ModelRegistry(
+        base_url="http://ollama.test",
+        ttl_seconds=ttl_seconds,
+        max_stale_seconds=max_stale_seconds,
+        transport=httpx.MockTransport(handler),
+    )
+
+
+def test_get_models_is_cached_within_ttl():
+    """
+    Test that the model list is fetched once and then served from memory.
+    """
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={"models": [{"name": "llama2"}, {"name": "mistral"}]})
+
+    registry = make_registry(handler)
+
+    async def scenario():
+        first = await registry.get_models()
+        second = await registry.get_models()
+        await registry.aclose()
+        return first, second
+
+    assert asyncio.run(scenario()) == (["llama2", "mistral"], ["llama2", "mistral"])
+    assert calls == ["/api/tags"]
+
+
+def test_stale_models_are_served_while_ollama_is_down():
+    """
+    Test that a stale list is still returned when the background refresh fails.
+    """
+    responses = [httpx.Response(200, json={"models": [{"name": "llama2"}]}), httpx.Response(503)]
+    registry = make_registry(lambda request: responses.pop(0), ttl_seconds=0)
+
+    async def scenario():
+        await registry.get_models()
+        stale = await registry.get_models()
+        await registry._refresh_task
+        await registry.aclose()
+        return stale
+
+    assert asyncio.run(scenario()) == ["llama2"]
+    assert responses == []
+
+
+def test_get_models_raises_without_cached_list():
+    """
+    Test that a failure with nothing cached raises ModelRegistryError.
+    """
+    registry = make_registry(lambda request: httpx.Response(500))
+
+    async def scenario():
+        try:
+            await registry.get_models()
+        finally:
+            await registry.aclose()
+
+    with pytest.raises(ModelRegistryError):
+        asyncio.run(scenario())
@@ -0,0 +1,80 @@
+import asyncio
+from unittest.mock import MagicMock, AsyncMock
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException, Response
+from src.pagination import build_projection, paginate
+
+
+def make_collection(docs, total=1000):
+    """
+    Build a mocked async collection whose find() chain returns the given documents.
+    """
+    collection = MagicMock()
+    collection.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(return_value=docs)
+    collection.estimated_document_count = AsyncMock(return_value=total)
+    return collection
+
+
+def test_paginate_full_page_sets_cursor_and_total():
+    """
+    Test that a full page returns stringified ids, the next cursor and the estimated total.
+    """
+    docs = [{"_id": ObjectId(), "response": "a"}, {"_id": ObjectId(), "response": "b"}]
+    last_id = str(docs[-1]["_id"])
+    collection = make_collection(docs)
+    response = Response()
+
+    items = asyncio.run(paginate(collection, response, limit=2))
+
+    assert [item["_id"] for item in items][-1] == last_id
+    assert response.headers["X-Next-Cursor"] == last_id
+    assert response.headers["X-Total-Count"] == "1000"
+    collection.find.assert_called_once_with({}, None)
+    collection.find.return_value.sort.assert_called_once_with("_id", 1)
+    collection.find.return_value.sort.return_value.limit.assert_called_once_with(2)
+
+
+def test_paginate_after_cursor_and_projection():
+    """
+    Test that the after cursor becomes an _id range and exclude becomes a projection.
+    """
+    after = ObjectId()
+    collection = make_collection([{"_id": ObjectId()}])
+    response = Response()
+
+    asyncio.run(paginate(collection, response, limit=10, after=str(after), exclude="response"))
+
+    collection.find.assert_called_once_with({"_id": {"$gt": after}}, {"response": 0})
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_paginate_newest_first():
+    """
+    Test that order="desc" sorts by descending _id and pages backwards from the cursor.
+    """
+    after = ObjectId()
+    collection = make_collection([{"_id": ObjectId()}])
+
+    asyncio.run(paginate(collection, Response(), limit=10, after=str(after), order="desc"))
+
+    collection.find.assert_called_once_with({"_id": {"$lt": after}}, None)
+    collection.find.return_value.sort.assert_called_once_with("_id", -1)
+
+
+def test_paginate_invalid_cursor():
+    """
+    Test that an invalid cursor is rejected with 400.
+    """
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(paginate(make_collection([]), Response(), after="not-an-id"))
+    assert exc.value.status_code == 400
+
+
+def test_build_projection_rejects_fields_and_exclude():
+    """
+    Test that fields and exclude cannot be combined.
+    """
+    assert build_projection(fields="user_message, response") == {"user_message": 1, "response": 1}
+    with pytest.raises(HTTPException):
+        build_projection(fields="a", exclude="b")
@@ -0,0 +1,119 @@
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
+from fastapi.testclient import TestClient
+from pymongo.errors import OperationFailure
+from src.main import app
+from src.query_plans import explain_queries, summarize_plan
+
+client = TestClient(app)
+
+INDEX_PLAN = {
+    "queryPlanner": {"winningPlan": {
+        "stage": "LIMIT",
+        "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "batch_id_batch_index"}},
+    }},
+    "executionStats": {"nReturned": 3, "totalKeysExamined": 3, "totalDocsExamined": 3, "executionTimeMillis": 0},
+}
+
+
+def mock_collection(explained):
+    collection = MagicMock()
+    cursor = collection.find.return_value
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.explain = AsyncMock(return_value=explained)
+    return collection
+
+
+def test_summarize_plan_reports_stages_and_indexes():
+    """
+    Test that summarize_plan() walks the winning plan and reports the indexes it uses.
+    """
+    summary = summarize_plan(INDEX_PLAN)
+
+    assert summary["stages"] == ["LIMIT", "FETCH", "IXSCAN"]
+    assert summary["indexes"] == ["batch_id_batch_index"]
+    assert summary["collection_scan"] is False
+    assert summary["docs_examined"] == 3
+
+
+def test_summarize_plan_flags_collection_scans():
+    """
+    Test that summarize_plan() flags a collection scan, also in plans of the slot based engine.
+    """
+    explained = {"queryPlanner": {"winningPlan": {"queryPlan": {"stage": "COLLSCAN"}}}}
+
+    summary = summarize_plan(explained)
+
+    assert summary["collection_scan"] is True
+    assert summary["indexes"] == []
+
+
+def test_explain_queries_applies_sort_and_limit():
+    """
+    Test that explain_queries() explains each query as the routes run it.
+    """
+    collection = mock_collection(INDEX_PLAN)
+    db = MagicMock()
+    db.get_collection.return_value = collection
+    queries = [{"name": "page", "collection": "responses", "filter": {}, "sort": [("_id", 1)], "limit": 10}]
+
+    report = asyncio.run(explain_queries(db, queries))
+
+    collection.find.assert_called_once_with({}, None)
+    collection.find.return_value.sort.assert_called_once_with([("_id", 1)])
+    collection.find.return_value.limit.assert_called_once_with(10)
+    assert report[0]["name"] == "page"
+    assert report[0]["indexes"] == ["batch_id_batch_index"]
+
+
+def test_explain_queries_reports_errors_per_query():
+    """
+    Test that a query that cannot be explained is reported without stopping the others.
+    """
+    collection = mock_collection(INDEX_PLAN)
+    collection.find.return_value.explain.side_effect = [OperationFailure("not authorized"), INDEX_PLAN]
+    db = MagicMock()
+    db.get_collection.return_value = collection
+    queries = [{"name": "a", "collection": "responses", "filter": {}}, {"name": "b", "collection": "responses", "filter": {}}]
+
+    report = asyncio.run(explain_queries(db, queries))
+
+    assert "not authorized" in report[0]["error"]
+    assert report[1]["stages"] == ["LIMIT", "FETCH", "IXSCAN"]
+
+
+@patch("src.main.get_database")
+def test_db_explain_endpoint_reports_every_query(mock_get_db):
+    """
+    Test that GET /db/explain returns a plan for each of the main queries.
+    """
+    mock_get_db.return_value.get_collection.return_value = mock_collection(INDEX_PLAN)
+
+    response = client.get("/db/explain")
+
+    assert response.status_code == 200
+    names = [entry["name"] for entry in response.json()]
+    assert "batch_results" in names
+    assert "responses_export_by_model" in names
+    assert "job_claim" in names
+
+
+@patch("src.main.get_database", return_value=None)
+def test_db_explain_endpoint_without_database(mock_get_db):
+    """
+    Test that GET /db/explain returns 503 when MongoDB is not connected.
+    """
+    response = client.get("/db/explain")
+
+    assert response.status_code == 503
+
+
+def test_db_pool_endpoint_reports_pool_stats():
+    """
+    Test that GET /db/pool returns the connection pool counters.
+    """
+    response = client.get("/db/pool")
+
+    assert response.status_code == 200
+    assert {"open", "in_use", "available", "max_pool_size"} <= set(response.json())
@@ -10,25 +10,38 @@ sys.modules["repository_module"] = repository_module
 spec.loader.exec_module(repository_module)
 
 
-@patch("repository_module.MongoClient")
-def test_init_db_sets_client_db_and_collection(mock_mongo_client):
+@patch("repository_module.get_client")
+def test_init_db_sets_client_db_and_collection(mock_get_client):
     """
-    Test that init_db sets the global client, db, and batches_collection.
+    Test that init_db sets the global client, db, and batches_collection
+    from the client shared with src.db.
     """
     mock_client = MagicMock()
     mock_db = MagicMock()
     mock_collection = MagicMock()
 
-    mock_mongo_client.return_value = mock_client
+    mock_get_client.return_value = mock_client
     mock_client.__getitem__.return_value = mock_db
     mock_db.__getitem__.return_value = mock_collection
 
     repository_module.init_db()
 
-    mock_mongo_client.assert_called_once_with("mongodb://localhost:27017")
-    mock_client.__getitem__.assert_called_with("llm_dispatch")
+    mock_get_client.assert_called_once_with()
+    mock_client.__getitem__.assert_called_with("mydb")
     mock_db.__getitem__.assert_called_with("message_batches")
 
     assert repository_module.client == mock_client
     assert repository_module.db == mock_db
     assert repository_module.batches_collection == mock_collection
+
+
+def test_import_does_not_connect():
+    """
+    Test that importing the repository creates no client.
+    """
+    spec = importlib.util.spec_from_file_location("repository_fresh", repo_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    assert module.client is None
+    assert module.batches_collection is None
@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
+from src.response_cache import ResponseCache, make_cache_key
+
+
+def test_make_cache_key_depends_on_prompt_model_and_params():
+    """
+    Test that the cache key changes with the prompt, the model and the generation params.
+    """
+    key = make_cache_key("prompt", "llama2")
+    assert key == make_cache_key("prompt", "llama2", {})
+    assert key != make_cache_key("other prompt", "llama2")
+    assert key != make_cache_key("prompt", "mistral")
+    assert key != make_cache_key("prompt", "llama2", {"temperature": 0.5})
+
+
+@patch("src.response_cache.get_database", return_value=None)
+def test_memory_tier_hits_and_evicts_least_recent(mock_get_db):
+    """
+    Test that the in-process tier counts hits and misses and evicts the least recently used entry.
+    """
+    cache = ResponseCache(max_entries=2)
+
+    async def scenario():
+        await cache.set("a", "A")
+        await cache.set("b", "B")
+        assert (await cache.get("a"))["response"] == "A"
+        await cache.set("c", "C")
+        return await cache.get("b")
+
+    assert asyncio.run(scenario()) is None
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 2
+
+
+@patch("src.response_cache.get_database")
+def test_persistent_tier_hit_fills_memory(mock_get_db):
+    """
+    Test that a MongoDB hit is returned and promoted to the in-process tier.
+    """
+    collection = MagicMock()
+    collection.find_one = AsyncMock(return_value={"_id": "k", "response": "R", "response_id": "abc"})
+    mock_get_db.return_value.get_collection.return_value = collection
+    cache = ResponseCache()
+
+    async def scenario():
+        first = await cache.get("k")
+        second = await cache.get("k")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == second == {"response": "R", "response_id": "abc"}
+    collection.find_one.assert_awaited_once()
+    assert cache.stats()["persistent_hits"] == 1
+    assert cache.stats()["memory_hits"] == 1
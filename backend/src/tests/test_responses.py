@@ -1,13 +1,15 @@
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from bson import ObjectId
 import pytest
 from src.routes.messages import router  # Import the messages router
+from src.routes.responses import router as responses_router
 
 # Create the FastAPI app and include the messages router
 app = FastAPI()
 app.include_router(router)
+app.include_router(responses_router)
 client = TestClient(app)
 
 FAKE_ID = str(ObjectId())  # Fake ObjectId for testing
@@ -20,6 +22,10 @@ def mock_db():
     """
     with patch("src.routes.messages.get_database") as mock_get_db:  # Patch the correct module
         mock_db = MagicMock()
+        mock_db.get_collection.return_value = MagicMock(
+            insert_one=AsyncMock(), find_one=AsyncMock(), delete_one=AsyncMock(),
+            estimated_document_count=AsyncMock(return_value=1)
+        )
         mock_get_db.return_value = mock_db
         yield mock_db
 
@@ -28,7 +34,7 @@ def test_save_user_message(mock_db):
     """
     Test saving a user message successfully.
     """
-    mock_collection = MagicMock()
+    mock_collection = MagicMock(insert_one=AsyncMock())
     mock_db.get_collection.return_value = mock_collection
 
     response = client.post("/messages/user", json={"message": "Hello!"})
@@ -40,7 +46,7 @@ def test_save_system_message(mock_db):
     """
     Test saving a system message successfully.
     """
-    mock_collection = MagicMock()
+    mock_collection = MagicMock(insert_one=AsyncMock())
     mock_collection.insert_one.return_value.inserted_id = FAKE_ID
     mock_db.get_collection.return_value = mock_collection
 
@@ -54,7 +60,9 @@ def test_list_user_messages(mock_db):
     Test listing user messages with mocked documents.
     """
     mock_cursor = [{"_id": ObjectId(), "message": "User 1"}]
-    mock_db.get_collection.return_value.find.return_value = mock_cursor
+    mock_db.get_collection.return_value.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+        return_value=mock_cursor
+    )
 
     response = client.get("/messages/user")
     assert response.status_code == 200
@@ -66,7 +74,9 @@ def test_list_system_messages(mock_db):
     Test listing system messages with mocked documents.
     """
     mock_cursor = [{"_id": ObjectId(), "message": "System 1"}]
-    mock_db.get_collection.return_value.find.return_value = mock_cursor
+    mock_db.get_collection.return_value.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+        return_value=mock_cursor
+    )
 
     response = client.get("/messages/system")
     assert response.status_code == 200
@@ -164,4 +174,66 @@ def test_delete_system_message_not_found(mock_db):
 
     response = client.delete(f"/messages/system/{FAKE_ID}")
     assert response.status_code == 404
-    assert response.json() == {"error": "System message not found"}
\ No newline at end of file
+    assert response.json() == {"error": "System message not found"}
+
+
+@pytest.fixture
+def mock_responses_db():
+    """
+    Fixture to patch get_database in the responses router.
+    """
+    with patch("src.routes.responses.get_database") as mock_get_db:
+        mock_db = MagicMock()
+        mock_get_db.return_value = mock_db
+        yield mock_db
+
+
+def mock_export_cursor(mock_db, docs):
+    """
+    Make the responses collection return an async cursor over the given documents.
+    """
+    cursor = MagicMock()
+    cursor.__aiter__.return_value = docs
+    find = mock_db.get_collection.return_value.find
+    find.return_value.sort.return_value.batch_size.return_value = cursor
+    return find
+
+
+def test_export_responses_ndjson(mock_responses_db):
+    """
+    Test that /responses/export streams one JSON document per line and filters by model and date.
+    """
+    doc_id = ObjectId()
+    find = mock_export_cursor(mock_responses_db, [
+        {"_id": doc_id, "model": "llama2", "system_message": "S", "user_message": "U", "response": "R"}
+    ])
+
+    response = client.get("/responses/export?model=llama2&start=2024-01-01T00:00:00")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    lines = response.text.splitlines()
+    assert len(lines) == 1
+    assert '"_id": "%s"' % doc_id in lines[0]
+    assert '"response": "R"' in lines[0]
+
+    query = find.call_args[0][0]
+    assert query["model"] == "llama2"
+    assert "$gte" in query["_id"]
+
+
+def test_export_responses_csv(mock_responses_db):
+    """
+    Test that /responses/export can stream CSV with a header row.
+    """
+    mock_export_cursor(mock_responses_db, [
+        {"_id": ObjectId(), "system_message": "S", "user_message": "U", "response": "R"},
+        {"_id": ObjectId(), "system_message": "S2", "user_message": "U2", "response": "R2"},
+    ])
+
+    response = client.get("/responses/export?format=csv")
+    assert response.status_code == 200
+    rows = response.text.splitlines()
+    assert rows[0] == "_id,created_at,model,system_message,user_message,response"
+    assert len(rows) == 3
+    assert rows[2].endswith(",S2,U2,R2")
@@ -10,7 +10,8 @@ export type Response = {
 
 const fetchResponses = async () => {
     try {
-        const res = await fetch("http://localhost:8000/responses");
+        // Newest first, so that the latest responses are on the first page
+        const res = await fetch("http://localhost:8000/responses?order=desc");
         if (!res.ok) {
             throw new Error(`HTTP error! status: ${res.status}`);
         }
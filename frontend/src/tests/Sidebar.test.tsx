@@ -58,6 +58,14 @@ describe('Sidebar Component', () => {
     })
   })
 
+  it('requests the newest responses first', async () => {
+    render(<Sidebar />)
+
+    await waitFor(() => {
+      expect(global.fetch).toHaveBeenCalledWith('http://localhost:8000/responses?order=desc')
+    })
+  })
+
   it('displays correct number of response items', async () => {
     render(<Sidebar />)
     
@@ -0,0 +1,110 @@
+"""
+Compares the code splitter with the previous character splitter.
+
+Builds a FAISS index of the dataset with each splitter and reports the chunk
+count, index size on disk and build time, and the retrieval hit rate: the
+share of sampled code snippets whose own file is among the top k results.
+
+    python benchmarks/bench_chunking.py --dataset path/to/code [--queries 200] [--k 5] [--fake-embeddings]
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAG_DIR = Path(__file__).resolve().parents[1]
+
+
+def load_module(name, file_name):
+    spec = importlib.util.spec_from_file_location(name, RAG_DIR / file_name)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+indexer_module = load_module("indexer_module", "indexer.py")
+chunking_module = load_module("chunking_module", "chunking.py")
+
+
+def directory_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def sample_queries(dataset_path, count, lines=3, seed=0):
+    """
+    Returns (relative path, snippet) pairs of `lines` consecutive non-blank lines.
+    """
+    rng = random.Random(seed)
+    files = sorted(indexer_module.scan_dataset(dataset_path))
+    queries = []
+    for _ in range(count * 10):
+        if len(queries) == count or not files:
+            break
+        relative = rng.choice(files)
+        with open(os.path.join(dataset_path, relative), "r", encoding="utf-8", errors="ignore") as f:
+            content = [line.strip() for line in f if line.strip()]
+        if len(content) < lines:
+            continue
+        start = rng.randrange(len(content) - lines + 1)
+        queries.append((relative, "\n".join(content[start:start + lines])))
+    return queries
+
+
+def bench(name, text_splitter, dataset_path, embeddings, queries, k):
+    with tempfile.TemporaryDirectory() as tmp:
+        index_path = os.path.join(tmp, "index")
+        start = time.perf_counter()
+        vectorstore = indexer_module.update_index(index_path, dataset_path, embeddings, text_splitter)
+        build_time = time.perf_counter() - start
+        size = directory_size(index_path)
+
+    hits = 0
+    for relative, snippet in queries:
+        results = vectorstore.similarity_search(snippet, k=k)
+        sources = {Path(doc.metadata["source"]).relative_to(dataset_path).as_posix() for doc in results}
+        hits += relative in sources
+    hit_rate = hits / len(queries) if queries else 0.0
+
+    print(
+        f"{name:<24} {vectorstore.index.ntotal:>8} chunks  {size / 1024:>10.1f} KiB  "
+        f"build {build_time:>7.2f}s  hit@{k} {hit_rate:.1%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark code chunking")
+    parser.add_argument("--dataset", default=os.getenv("DATASET_PATH"), help="Code dataset to index")
+    parser.add_argument("--queries", type=int, default=200, help="Snippets sampled for the hit rate")
+    parser.add_argument("--k", type=int, default=5, help="Retrieved chunks per query")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="Use random embeddings, which times chunking alone but makes the hit rate meaningless")
+    args = parser.parse_args()
+    if not args.dataset:
+        parser.error("--dataset or DATASET_PATH is required")
+    dataset_path = os.path.abspath(args.dataset)
+
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        embeddings = DeterministicFakeEmbedding(size=768)
+    else:
+        embeddings = indexer_module.embeddings_module.create_embeddings()
+
+    from langchain.text_splitter import CharacterTextSplitter
+
+    splitters = {
+        "character 500/100": CharacterTextSplitter(chunk_size=500, chunk_overlap=100, separator="\n"),
+        f"code {chunking_module.CHUNK_SIZE_TOKENS} tokens": chunking_module.CodeSplitter(),
+    }
+    queries = sample_queries(dataset_path, args.queries)
+    for name, text_splitter in splitters.items():
+        bench(name, text_splitter, dataset_path, embeddings, queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Compares FAISS index types with the flat index.
+
+For each index factory string, reports build time, size on disk, load time
+when read and when memory-mapped, query latency and recall@k against the
+exact results of a flat index. Vectors come from an existing index, or are
+generated as clustered random vectors.
+
+    python benchmarks/bench_index.py --index ../faiss_index_ [--factories IVF256,PQ64 HNSW32]
+    python benchmarks/bench_index.py --vectors 100000 --dim 768
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+DEFAULT_FACTORIES = ["IVF256,Flat", "IVF256,PQ64", "HNSW32"]
+
+
+def load_vectors(index_path):
+    index = faiss.read_index(os.path.join(index_path, "index.faiss"))
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def synthetic_vectors(count, dim, clusters=100, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype("float32")
+    labels = rng.integers(clusters, size=count)
+    return centers[labels] + 0.3 * rng.normal(size=(count, dim)).astype("float32")
+
+
+def sample_queries(vectors, count, seed=1):
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), size=min(count, len(vectors)), replace=False)]
+    return picked + 0.05 * rng.normal(size=picked.shape).astype("float32")
+
+
+def time_queries(index, queries, k):
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        timings.append(time.perf_counter() - start)
+        results.append(ids[0])
+    return timings, np.array(results)
+
+
+def recall(found, expected):
+    k = expected.shape[1]
+    return sum(len(set(a) & set(b)) for a, b in zip(found, expected)) / (len(expected) * k)
+
+
+def bench(factory, vectors, queries, expected, k, nprobe, ef_search, tmp):
+    start = time.perf_counter()
+    index = faiss.index_factory(vectors.shape[1], factory)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    build_time = time.perf_counter() - start
+
+    path = os.path.join(tmp, "bench.faiss")
+    faiss.write_index(index, path)
+    size = os.path.getsize(path)
+
+    load_times = {}
+    for name, flags in (("read", 0), ("mmap", faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)):
+        start = time.perf_counter()
+        index = faiss.read_index(path, flags)
+        load_times[name] = time.perf_counter() - start
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = nprobe
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+    timings, found = time_queries(index, queries, k)
+    p95 = sorted(timings)[int(0.95 * (len(timings) - 1))]
+    print(
+        f"{factory:<16} build {build_time:>7.2f}s  {size / 2**20:>9.1f} MiB  "
+        f"load {load_times['read'] * 1000:>7.1f}ms read {load_times['mmap'] * 1000:>7.1f}ms mmap  "
+        f"query {statistics.median(timings) * 1000:.3f}ms p50 {p95 * 1000:.3f}ms p95  "
+        f"recall@{k} {recall(found, expected):.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index types")
+    parser.add_argument("--index", help="Saved index to take the vectors from")
+    parser.add_argument("--vectors", type=int, default=50000, help="Synthetic vectors when no index is given")
+    parser.add_argument("--dim", type=int, default=768, help="Dimension of the synthetic vectors")
+    parser.add_argument("--factories", nargs="+", default=DEFAULT_FACTORIES, help="faiss.index_factory strings")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--ef-search", type=int, default=64)
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.index) if args.index else synthetic_vectors(args.vectors, args.dim)
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    queries = sample_queries(vectors, args.queries)
+    print(f"{len(vectors)} vectors of dimension {vectors.shape[1]}, {len(queries)} queries")
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    _, expected = flat.search(queries, args.k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for factory in ["Flat"] + args.factories:
+            bench(factory, vectors, queries, expected, args.k, args.nprobe, args.ef_search, tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Compares loading an index saved by FAISS.save_local, which pickles the
+docstore, with the FAISS binary and SQLite docstore used by the indexer.
+
+Builds a synthetic index of --chunks chunks, saves it in both formats and
+reports the median load time, the time of the first search and the size of
+the files.
+
+    python benchmarks/bench_index_load.py --chunks 100000 --runs 5
+"""
+import argparse
+import importlib.util
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+RAG_DIR = Path(__file__).resolve().parents[1]
+
+spec = importlib.util.spec_from_file_location("index_store_module", RAG_DIR / "index_store.py")
+index_store_module = importlib.util.module_from_spec(spec)
+sys.modules["index_store_module"] = index_store_module
+spec.loader.exec_module(index_store_module)
+
+
+def build(chunks, dim, chunk_chars, embeddings):
+    from langchain_community.vectorstores import FAISS
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(chunks, dim)).astype("float32")
+    text = "x = compute(value)\n" * (chunk_chars // 19)
+    texts = [f"# chunk {i}\n{text}" for i in range(chunks)]
+    metadatas = [{"source": f"src/module_{i // 10}.py"} for i in range(chunks)]
+    vectorstore = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas)
+    return vectorstore, vectors
+
+
+def time_load(load, query, runs):
+    load_times, search_times = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        vectorstore = load()
+        load_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        vectorstore.similarity_search_with_score_by_vector(query, k=5)
+        search_times.append(time.perf_counter() - start)
+    return statistics.median(load_times), statistics.median(search_times)
+
+
+def report(name, paths, load_time, search_time):
+    size = sum(path.stat().st_size for path in paths)
+    print(f"{name:<16} load {load_time * 1000:>9.1f}ms  first search {search_time * 1000:>7.2f}ms  {size / 2**20:>8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark index load time")
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--chunk-chars", type=int, default=1000, help="Characters of text per chunk")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    embeddings = DeterministicFakeEmbedding(size=args.dim)
+    vectorstore, vectors = build(args.chunks, args.dim, args.chunk_chars, embeddings)
+    query = vectors[0].tolist()
+    settings = index_store_module.index_settings(embeddings, args.dim)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pickled, current = Path(tmp) / "pickled", Path(tmp) / "current"
+        vectorstore.save_local(str(pickled))
+        index_store_module.save_vectorstore(vectorstore, str(current))
+
+        print(f"{args.chunks} chunks of {args.chunk_chars} characters, dimension {args.dim}")
+        report("pickle", list(pickled.iterdir()), *time_load(
+            lambda: FAISS.load_local(str(pickled), embeddings, allow_dangerous_deserialization=True),
+            query, args.runs,
+        ))
+        report("faiss + sqlite", list(current.iterdir()), *time_load(
+            lambda: index_store_module.load_vectorstore(str(current), embeddings, settings, settings),
+            query, args.runs,
+        ))
+        report("... with mmap", list(current.iterdir()), *time_load(
+            lambda: index_store_module.load_vectorstore(str(current), embeddings, settings, settings, mmap=True),
+            query, args.runs,
+        ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures CLI startup time.
+
+Runs `main.py --help` and a bare import of rag.py in fresh interpreters, and
+optionally the time to build the QA chain on first use.
+
+    python benchmarks/bench_startup.py --runs 5 [--with-chain]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RAG_DIR = Path(__file__).resolve().parents[1]
+
+IMPORT_RAG = (
+    "import importlib.util, sys;"
+    "spec = importlib.util.spec_from_file_location('rag_module', 'rag.py');"
+    "module = importlib.util.module_from_spec(spec);"
+    "sys.modules['rag_module'] = module;"
+    "spec.loader.exec_module(module)"
+)
+
+BUILD_CHAIN = IMPORT_RAG + ";module.get_qa_chain()"
+
+
+def time_command(args, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=RAG_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings):
+    print(f"{name:<20} median {statistics.median(timings):.3f}s  min {min(timings):.3f}s  max {max(timings):.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAG CLI startup")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--with-chain", action="store_true", help="Also time building the QA chain")
+    args = parser.parse_args()
+
+    report("main.py --help", time_command([sys.executable, "main.py", "--help"], args.runs))
+    report("import rag.py", time_command([sys.executable, "-c", IMPORT_RAG], args.runs))
+    if args.with_chain:
+        report("build QA chain", time_command([sys.executable, "-c", BUILD_CHAIN], 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import re
+from pathlib import Path
+
+# Sized below the 384 word pieces all-mpnet-base-v2 embeds, since the
+# approximate count below runs a little under the model's tokenizer
+CHUNK_SIZE_TOKENS = int(os.getenv("CHUNK_SIZE_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+
+# Bump when the separators change so that existing indexes are rebuilt
+CODE_SPLITTER_VERSION = 1
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Split points from the coarsest to the finest. A definition is split off at
+# the blank line before it, which keeps decorators and annotations attached,
+# and stays whole when it fits in a chunk. Longer ones are cut at blank lines,
+# then lines.
+def _top_level(pattern):
+    return rf"(?<=\n)\n(?={pattern})"
+
+
+def _nested(pattern):
+    return rf"(?<=\n)\n(?=[ \t]+(?:{pattern}))"
+
+
+_PY_DEF = r"@|class |(?:async )?def "
+_JS_PREFIX = r"(?:export[ \t]+)?(?:default[ \t]+)?"
+_JS_CLASS = rf"{_JS_PREFIX}(?:abstract[ \t]+)?class[ \t]"
+_JS_FUNCTION = rf"{_JS_PREFIX}(?:async[ \t]+)?function[ \t*]|{_JS_PREFIX}(?:const|let|var)[ \t]"
+_JS_METHOD = (
+    r"@|(?:(?:public|private|protected|static|readonly|abstract|async|get|set)[ \t]+)*"
+    r"[\w$]+[ \t]*(?:<[^>\n]*>)?\([^)\n]*\)[^;\n]*\{"
+)
+_JAVA_MODIFIERS = r"(?:(?:public|protected|private|static|final|abstract|sealed|synchronized|default)[ \t]+)"
+_JAVA_TYPE = rf"@|{_JAVA_MODIFIERS}*(?:class|interface|enum|record)[ \t]"
+_JAVA_METHOD = rf"@|{_JAVA_MODIFIERS}*[\w<>\[\],.? \t]+[ \t]\w+[ \t]*\("
+
+SEPARATORS = {
+    "python": [_top_level(_PY_DEF), _nested(_PY_DEF)],
+    "js": [_top_level(_JS_CLASS), _top_level(_JS_FUNCTION), _nested(_JS_METHOD)],
+    "ts": [
+        _top_level(rf"{_JS_CLASS}|{_JS_PREFIX}(?:interface|enum|namespace|type)[ \t]"),
+        _top_level(_JS_FUNCTION),
+        _nested(_JS_METHOD),
+    ],
+    "java": [_top_level(_JAVA_TYPE), _nested(_JAVA_TYPE), _nested(_JAVA_METHOD)],
+}
+FALLBACK_SEPARATORS = [r"\n\n", r"\n", r" ", ""]
+
+LANGUAGES = {".py": "python", ".js": "js", ".ts": "ts", ".java": "java"}
+
+
+def count_tokens(text):
+    """
+    Approximates the token count of code as its words and punctuation marks.
+    """
+    return len(TOKEN_PATTERN.findall(text))
+
+
+class CodeSplitter:
+    """
+    Splits code documents on class and function boundaries, picking the
+    separators from each document's file extension and sizing chunks in
+    tokens. Files in other languages are split on blank lines and lines.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE_TOKENS, chunk_overlap=CHUNK_OVERLAP_TOKENS, length_function=count_tokens):
+        self._chunk_size = chunk_size
+        self._chunk_overlap = chunk_overlap
+        self._length_function = length_function
+        self._splitters = {}
+
+    @property
+    def signature(self):
+        """
+        Identifies the chunking, indexes built with another one are rebuilt.
+        """
+        return f"CodeSplitter:v{CODE_SPLITTER_VERSION}:{self._chunk_size}:{self._chunk_overlap}"
+
+    def _splitter_for(self, source):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        language = LANGUAGES.get(Path(source).suffix)
+        if language not in self._splitters:
+            self._splitters[language] = RecursiveCharacterTextSplitter(
+                separators=SEPARATORS.get(language, []) + FALLBACK_SEPARATORS,
+                is_separator_regex=True,
+                chunk_size=self._chunk_size,
+                chunk_overlap=self._chunk_overlap,
+                length_function=self._length_function,
+            )
+        return self._splitters[language]
+
+    def split_text(self, text, source=""):
+        return self._splitter_for(source).split_text(text)
+
+    def split_documents(self, documents):
+        chunks = []
+        for document in documents:
+            splitter = self._splitter_for(document.metadata.get("source", ""))
+            chunks.extend(splitter.split_documents([document]))
+        return chunks
@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+
+# "auto" picks cuda, then mps, then cpu
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "auto")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# Number of processes used to embed chunks on CPU, 1 embeds in-process
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))
+# Shards per worker, so a slow shard does not leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+
+def select_device(requested=EMBEDDING_DEVICE):
+    """
+    Returns the requested device, or the best one available when it is "auto".
+    """
+    if requested and requested != "auto":
+        return requested
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    if torch.cuda.is_available():
+        return "cuda"
+    mps = getattr(torch.backends, "mps", None)
+    if mps is not None and mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def create_embeddings(device=None, batch_size=EMBEDDING_BATCH_SIZE, model_name=EMBEDDING_MODEL_NAME):
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    device = device or select_device()
+    print(f"Loading embedding model on {device}...")
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": device},
+        encode_kwargs={"batch_size": batch_size},
+    )
+
+
+def shard(items, count):
+    """
+    Splits items into at most count contiguous, nearly equal shards.
+    """
+    count = max(1, min(count, len(items)))
+    size, extra = divmod(len(items), count)
+    shards, start = [], 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        shards.append(items[start:end])
+        start = end
+    return shards
+
+
+_worker_embeddings = None
+
+
+def _init_worker(model_name, batch_size, threads):
+    import torch
+
+    global _worker_embeddings
+    torch.set_num_threads(threads)
+    _worker_embeddings = create_embeddings("cpu", batch_size, model_name)
+
+
+def _embed_shard(texts):
+    return _worker_embeddings.embed_documents(texts)
+
+
+def embed_texts(texts, embeddings, workers=EMBEDDING_WORKERS, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Embeds texts in-process, or across worker processes when workers > 1.
+
+    Each worker loads its own CPU copy of the model and the shards are
+    concatenated in their original order.
+    """
+    device = getattr(embeddings, "model_kwargs", {}).get("device", "cpu")
+    if workers <= 1 or len(texts) < workers or device != "cpu":
+        return embeddings.embed_documents(texts)
+
+    # Spawned workers import this module by its file name
+    rag_dir = str(Path(__file__).parent)
+    if rag_dir not in sys.path:
+        sys.path.insert(0, rag_dir)
+    import embeddings as worker_module
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"Embedding {len(texts)} chunks with {workers} processes...")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=worker_module._init_worker,
+        initargs=(embeddings.model_name, batch_size, threads),
+    ) as executor:
+        results = executor.map(worker_module._embed_shard, shard(texts, workers * SHARDS_PER_WORKER))
+        return [vector for vectors in results for vector in vectors]
@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import threading
+
+# Bump when the files below change layout, older indexes are then rebuilt
+INDEX_FORMAT_VERSION = 1
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.sqlite"
+# Written by FAISS.save_local, which this format replaces
+LEGACY_FILES = ("index.pkl",)
+
+
+class IndexFormatError(ValueError):
+    """Raised when a saved index does not match the format or the embeddings in use"""
+
+
+def embedding_model_name(embeddings):
+    return getattr(embeddings, "model_name", None) or type(embeddings).__name__
+
+
+def embedding_dimension(embeddings):
+    return len(embeddings.embed_query("dimension"))
+
+
+def index_settings(embeddings, dimension=None):
+    """
+    Returns what a saved index must have been built with to be loaded with
+    these embeddings.
+    """
+    return {
+        "format": INDEX_FORMAT_VERSION,
+        "embedding_model": embedding_model_name(embeddings),
+        "dimension": dimension or embedding_dimension(embeddings),
+    }
+
+
+def check_manifest(manifest, settings):
+    """
+    Raises IndexFormatError when the manifest differs from the expected settings.
+    """
+    if manifest is None:
+        raise IndexFormatError("Index has no manifest")
+    mismatches = [
+        f"{key} is {manifest.get(key)!r}, expected {expected!r}"
+        for key, expected in settings.items()
+        if manifest.get(key) != expected
+    ]
+    if mismatches:
+        raise IndexFormatError("Index does not match: " + "; ".join(mismatches))
+
+
+class SQLiteDocstore:
+    """
+    Document store read lazily from SQLite, one row per chunk. Changes are
+    kept in memory until write() saves them to a new file, so the file being
+    read is never modified.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._added = {}
+        self._deleted = set()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def search(self, search):
+        from langchain_core.documents import Document
+
+        if search in self._added:
+            return self._added[search]
+        if search in self._deleted or self._conn is None:
+            return f"ID {search} not found."
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, metadata FROM documents WHERE id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def add(self, texts):
+        self._added.update(texts)
+        self._deleted.difference_update(texts)
+
+    def delete(self, ids):
+        for doc_id in ids:
+            if self._added.pop(doc_id, None) is None:
+                self._deleted.add(doc_id)
+
+    def positions(self):
+        """
+        Returns the saved {index position: document id} mapping.
+        """
+        with self._lock:
+            return dict(self._conn.execute("SELECT position, id FROM positions"))
+
+    def _saved_rows(self):
+        if self._conn is None:
+            return
+        with self._lock:
+            for row in self._conn.execute("SELECT id, content, metadata FROM documents"):
+                if row[0] not in self._deleted and row[0] not in self._added:
+                    yield row
+
+    def write(self, path, index_to_docstore_id):
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("CREATE TABLE documents (id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)")
+            conn.execute("CREATE TABLE positions (position INTEGER PRIMARY KEY, id TEXT NOT NULL)")
+            conn.executemany("INSERT INTO documents VALUES (?, ?, ?)", self._saved_rows())
+            conn.executemany(
+                "INSERT INTO documents VALUES (?, ?, ?)",
+                ((doc_id, doc.page_content, json.dumps(doc.metadata)) for doc_id, doc in self._added.items()),
+            )
+            conn.executemany("INSERT INTO positions VALUES (?, ?)", index_to_docstore_id.items())
+            conn.commit()
+        finally:
+            conn.close()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_registered = False
+
+
+def new_docstore(path=None):
+    """
+    Returns a SQLiteDocstore that FAISS accepts as an addable docstore.
+    """
+    global _registered
+    if not _registered:
+        # Registered on first use, langchain_community is slow to import
+        from langchain_community.docstore.base import AddableMixin, Docstore
+
+        Docstore.register(SQLiteDocstore)
+        AddableMixin.register(SQLiteDocstore)
+        _registered = True
+    return SQLiteDocstore(path)
+
+
+def save_vectorstore(vectorstore, index_path):
+    """
+    Writes the FAISS index and its documents next to each other, each file
+    replaced only once it is complete.
+    """
+    import faiss
+
+    os.makedirs(index_path, exist_ok=True)
+    docstore = vectorstore.docstore
+    if not isinstance(docstore, SQLiteDocstore):
+        docstore = new_docstore()
+        docstore.add({doc_id: vectorstore.docstore.search(doc_id) for doc_id in vectorstore.index_to_docstore_id.values()})
+
+    index_file = os.path.join(index_path, INDEX_FILE)
+    docstore_file = os.path.join(index_path, DOCSTORE_FILE)
+    for tmp_file in (index_file + ".tmp", docstore_file + ".tmp"):
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+    faiss.write_index(vectorstore.index, index_file + ".tmp")
+    docstore.write(docstore_file + ".tmp", vectorstore.index_to_docstore_id)
+
+    docstore.close()
+    os.replace(index_file + ".tmp", index_file)
+    os.replace(docstore_file + ".tmp", docstore_file)
+    for name in LEGACY_FILES:
+        legacy_file = os.path.join(index_path, name)
+        if os.path.exists(legacy_file):
+            os.remove(legacy_file)
+    vectorstore.docstore = new_docstore(docstore_file)
+
+
+def load_vectorstore(index_path, embeddings, manifest, settings, mmap=False):
+    """
+    Loads a saved index after checking that it matches the settings. Only
+    the position to id mapping is read up front, documents are read when a
+    search returns them. With mmap the FAISS index is memory-mapped, read-only.
+    """
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    check_manifest(manifest, settings)
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+    index = faiss.read_index(os.path.join(index_path, INDEX_FILE), flags)
+    if index.d != settings["dimension"]:
+        raise IndexFormatError(f"Index has dimension {index.d}, expected {settings['dimension']}")
+    docstore = new_docstore(os.path.join(index_path, DOCSTORE_FILE))
+    return FAISS(embeddings, index, docstore, docstore.positions())
@@ -0,0 +1,286 @@
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import uuid
+from pathlib import Path
+
+embeddings_path = (Path(__file__).parent / "embeddings.py").resolve()
+spec = importlib.util.spec_from_file_location("embeddings_module", embeddings_path)
+embeddings_module = importlib.util.module_from_spec(spec)
+sys.modules["embeddings_module"] = embeddings_module
+spec.loader.exec_module(embeddings_module)
+
+index_store_path = (Path(__file__).parent / "index_store.py").resolve()
+spec = importlib.util.spec_from_file_location("index_store_module", index_store_path)
+index_store_module = importlib.util.module_from_spec(spec)
+sys.modules["index_store_module"] = index_store_module
+spec.loader.exec_module(index_store_module)
+
+embed_texts = embeddings_module.embed_texts
+index_settings = index_store_module.index_settings
+save_vectorstore = index_store_module.save_vectorstore
+
+CODE_EXTENSIONS = {".java", ".py", ".js", ".ts"}
+MANIFEST_FILE = "manifest.json"
+
+# A faiss.index_factory string, e.g. "Flat", "IVF1024,PQ64" or "HNSW32"
+FAISS_INDEX_FACTORY = os.getenv("FAISS_INDEX_FACTORY", "Flat")
+# Inverted lists probed per IVF search, and candidates kept per HNSW search
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+# Map the saved index into memory instead of reading it, so that processes
+# using the same index share its pages
+FAISS_MMAP = os.getenv("FAISS_MMAP", "0").lower() in ("1", "true", "yes")
+
+
+def file_digest(file_path):
+    """
+    Returns the SHA-256 of a file's content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_dataset(dataset_path):
+    """
+    Returns {relative path: stat info} for every code file in the dataset.
+    """
+    files = {}
+    for root, _, filenames in os.walk(dataset_path):
+        for name in filenames:
+            if Path(name).suffix in CODE_EXTENSIONS:
+                full_path = os.path.join(root, name)
+                stat = os.stat(full_path)
+                relative = Path(full_path).relative_to(dataset_path).as_posix()
+                files[relative] = {"mtime": stat.st_mtime, "size": stat.st_size}
+    return files
+
+
+def load_manifest(index_path):
+    manifest_path = os.path.join(index_path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def index_version(index_path):
+    """
+    Returns a digest of the index's settings and the content hash of every
+    indexed file, or None when there is no index yet. Touching a file or
+    checking it out again does not change it.
+    """
+    manifest = load_manifest(index_path)
+    if manifest is None:
+        return None
+    payload = {key: value for key, value in manifest.items() if key != "files"}
+    payload["files"] = sorted((path, info.get("sha256")) for path, info in manifest.get("files", {}).items())
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def save_manifest(index_path, manifest):
+    manifest_path = os.path.join(index_path, MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+
+def plan_update(manifest_files, dataset_path):
+    """
+    Compares the dataset with the manifest.
+
+    Files whose mtime and size match the manifest are assumed unchanged, the
+    rest are hashed so that a touched but identical file is not re-embedded.
+    Returns (added, modified, removed, current) where current maps every
+    present file to its stat info and digest.
+    """
+    current = scan_dataset(dataset_path)
+    added, modified = [], []
+
+    for relative, info in current.items():
+        known = manifest_files.get(relative)
+        if known and known["mtime"] == info["mtime"] and known["size"] == info["size"]:
+            info["sha256"] = known["sha256"]
+            continue
+        info["sha256"] = file_digest(os.path.join(dataset_path, relative))
+        if known is None:
+            added.append(relative)
+        elif known["sha256"] != info["sha256"]:
+            modified.append(relative)
+
+    removed = [relative for relative in manifest_files if relative not in current]
+    return added, modified, removed, current
+
+
+def splitter_signature(text_splitter):
+    """
+    Identifies how a splitter chunks text, so that an index built with other
+    chunks is not updated with these.
+    """
+    signature = getattr(text_splitter, "signature", None)
+    if signature:
+        return signature
+    return f"{type(text_splitter).__name__}:{text_splitter._chunk_size}:{text_splitter._chunk_overlap}"
+
+
+def create_index(index_factory, vectors):
+    """
+    Creates an empty FAISS index of the vectors' dimension, trained on them
+    when the index type needs training.
+    """
+    import faiss
+
+    index = faiss.index_factory(vectors.shape[1], index_factory)
+    if not index.is_trained:
+        try:
+            index.train(vectors)
+        except RuntimeError as e:
+            raise ValueError(
+                f"Cannot train a {index_factory} index on {len(vectors)} vectors, "
+                f"use fewer lists or FAISS_INDEX_FACTORY=Flat: {e}"
+            ) from e
+    return index
+
+
+def configure_search(index):
+    import faiss
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = FAISS_NPROBE
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = FAISS_EF_SEARCH
+
+
+def load_vectorstore(index_path, embeddings, mmap=False, settings=None):
+    """
+    Loads the index saved at index_path, raising IndexFormatError when it
+    was saved in another format or with other embeddings.
+    """
+    settings = settings or index_settings(embeddings)
+    return index_store_module.load_vectorstore(index_path, embeddings, load_manifest(index_path), settings, mmap)
+
+
+def remove_vectors(vectorstore, ids, index_factory):
+    """
+    Deletes the vectors with the given docstore ids.
+    """
+    try:
+        vectorstore.delete(ids)
+        return
+    except RuntimeError:
+        pass
+
+    # HNSW graphs cannot drop nodes, so the graph is rebuilt from the stored
+    # vectors that remain instead of embedding them again
+    import numpy as np
+
+    stale = set(ids)
+    keep = [(i, doc_id) for i, doc_id in sorted(vectorstore.index_to_docstore_id.items()) if doc_id not in stale]
+    positions = np.array([i for i, _ in keep], dtype="int64")
+    vectors = vectorstore.index.reconstruct_batch(positions) if keep else np.zeros((0, vectorstore.index.d), "float32")
+    index = create_index(index_factory, vectors)
+    index.add(vectors)
+    vectorstore.index = index
+    vectorstore.docstore.delete(ids)
+    vectorstore.index_to_docstore_id = {n: doc_id for n, (_, doc_id) in enumerate(keep)}
+
+
+def load_documents(dataset_path, relative_paths):
+    from langchain_community.document_loaders import TextLoader
+
+    documents = []
+    for relative in relative_paths:
+        loader = TextLoader(os.path.join(dataset_path, relative), encoding="utf-8")
+        documents.extend(loader.load())
+    return documents
+
+
+def update_index(index_path, dataset_path, embeddings, text_splitter, workers=1,
+                 index_factory=FAISS_INDEX_FACTORY, mmap=FAISS_MMAP):
+    """
+    Brings the FAISS index at index_path in line with the dataset.
+
+    Only added or modified files are embedded, and vectors belonging to
+    modified or removed files are deleted. An index without a manifest
+    cannot be mapped back to its files, and one built with another splitter
+    or index type would mix chunks or vectors, so these are rebuilt once.
+    With workers > 1 the chunks are embedded by that many CPU processes.
+    With mmap the saved index is memory-mapped, read-only.
+    """
+    import numpy as np
+    from langchain_community.vectorstores import FAISS
+
+    store_settings = index_settings(embeddings)
+    settings = {"splitter": splitter_signature(text_splitter), "index_factory": index_factory, **store_settings}
+    manifest = load_manifest(index_path)
+    reuse = manifest is not None and all(manifest.get(key) == value for key, value in settings.items())
+    if not reuse:
+        if manifest is not None:
+            try:
+                index_store_module.check_manifest(manifest, settings)
+            except index_store_module.IndexFormatError as e:
+                print(f"{e}, rebuilding it...")
+        elif os.path.exists(index_path):
+            print("Index has no manifest, rebuilding it...")
+        manifest = {"files": {}}
+
+    manifest_files = manifest["files"]
+    added, modified, removed, current = plan_update(manifest_files, dataset_path)
+    print(f"Index update: {len(added)} added, {len(modified)} modified, {len(removed)} removed")
+    changed = added + modified
+
+    vectorstore = None
+    if reuse:
+        print(f"Loading FAISS vector store from {index_path}...")
+        # A memory-mapped index is read-only, so one that changes is read
+        vectorstore = load_vectorstore(
+            index_path, embeddings, mmap=mmap and not (changed or removed), settings=store_settings
+        )
+
+    stale_ids = [doc_id for relative in modified + removed for doc_id in manifest_files[relative]["ids"]]
+    if vectorstore is not None and stale_ids:
+        remove_vectors(vectorstore, stale_ids, index_factory)
+
+    files = {}
+    for relative, info in current.items():
+        if relative in manifest_files and relative not in modified:
+            files[relative] = {**info, "ids": manifest_files[relative]["ids"]}
+
+    if changed:
+        print(f"Embedding {len(changed)} files...")
+        docs = text_splitter.split_documents(documents=load_documents(dataset_path, changed))
+        sources = {os.path.join(dataset_path, relative): relative for relative in changed}
+        ids = [uuid.uuid4().hex for _ in docs]
+        for doc, doc_id in zip(docs, ids):
+            relative = sources[doc.metadata["source"]]
+            files.setdefault(relative, {**current[relative], "ids": []})["ids"].append(doc_id)
+        for relative in changed:
+            files.setdefault(relative, {**current[relative], "ids": []})
+
+        if docs:
+            texts = [doc.page_content for doc in docs]
+            vectors = embed_texts(texts, embeddings, workers)
+            if vectorstore is None:
+                index = create_index(index_factory, np.array(vectors, dtype="float32"))
+                vectorstore = FAISS(embeddings, index, index_store_module.new_docstore(), {})
+            vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=[doc.metadata for doc in docs], ids=ids)
+
+    if vectorstore is None:
+        raise ValueError(f"No code files to index in {dataset_path}")
+
+    if changed or removed:
+        save_vectorstore(vectorstore, index_path)
+    if changed or removed or files != manifest_files or not reuse:
+        save_manifest(index_path, {**settings, "files": files})
+    if mmap and (changed or removed):
+        vectorstore = load_vectorstore(index_path, embeddings, mmap=True, settings=store_settings)
+    configure_search(vectorstore.index)
+    return vectorstore
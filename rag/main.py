@@ -3,8 +3,12 @@ from pathlib import Path
 import sys
 import os
 import argparse
+import fnmatch
+import json
+import time
 import inquirer
 import signal
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 rag_path = (Path(__file__).parent / "rag.py").resolve()
@@ -13,12 +17,24 @@ rag_module = importlib.util.module_from_spec(spec)
 sys.modules["rag_module"] = rag_module
 spec.loader.exec_module(rag_module)
 
+cache_path = (Path(__file__).parent / "analysis_cache.py").resolve()
+spec = importlib.util.spec_from_file_location("analysis_cache_module", cache_path)
+analysis_cache_module = importlib.util.module_from_spec(spec)
+sys.modules["analysis_cache_module"] = analysis_cache_module
+spec.loader.exec_module(analysis_cache_module)
+
 prompt_llm = rag_module.prompt_llm
 
 BACKEND_PATH = "../backend"
 load_dotenv()
 
 DATASET_PATH = os.getenv("DATASET_PATH")
+ANALYSIS_CACHE_PATH = os.getenv(
+    "ANALYSIS_CACHE_PATH", str(Path(__file__).parent.parent / "analysis_cache.sqlite")
+)
+
+# Opened by main() unless --no-cache is given
+analysis_cache = None
 
 def signal_handler(sig, frame):
     print("\n\n👋 Interrupted by user. Exiting program. Goodbye!")
@@ -55,12 +71,35 @@ def select_file_or_action(files):
         return "Quit Program"
         
 
+def analysis_cache_key(code):
+    # Bring the index up to date first, so that the key has the version the analysis will use
+    rag_module.get_vectorstore()
+    templates = rag_module.template + rag_module.part_template + rag_module.merge_template
+    return analysis_cache_module.make_key(
+        code, rag_module.model_name, templates, rag_module.get_index_version()
+    )
+
+def cached_prompt_llm(code, source=""):
+    """
+    Returns the stored analysis of code when neither the code, the model, the
+    prompt template nor the index changed since it was made, otherwise asks
+    the LLM and stores its answer.
+    """
+    if analysis_cache is None:
+        return prompt_llm(code, source)
+    key = analysis_cache_key(code)
+    result = analysis_cache.get(key)
+    if result is None:
+        result = prompt_llm(code, source)
+        analysis_cache.put(key, result)
+    return result
+
 def analyze_file(file_path):
     try:
         with open(file_path, "r", encoding="utf-8") as f:
             code = f.read()
             print(f"\n🧪 Analyzing {file_path}...\n")
-            result = prompt_llm(code)
+            result = cached_prompt_llm(code, file_path)
             print("\n🔍 Result:")
             print(result)
             print("\n" + "-" * 60)
@@ -68,14 +107,183 @@ def analyze_file(file_path):
         print(f"\n❌ Error analyzing file: {e}")
         print("-" * 60)
 
+def search_file(file_path, k=5):
+    """
+    Prints the indexed chunks most similar to a file, without the LLM.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        code = f.read()
+    for rank, hit in enumerate(rag_module.retrieve(code, k), start=1):
+        print(f"\n{rank}. {hit['source']} (distance {hit['score']:.4f})")
+        print(hit["content"])
+
+def warm_retrieval(files):
+    """
+    Embeds the files the batch will send to the LLM in one go, leaving out
+    cached results and files too large for one request, which are retrieved
+    per part.
+    """
+    budget = rag_module.code_token_budget()
+    codes = []
+    for file_path in files:
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                code = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue  # Reported by the analysis itself
+        if analysis_cache is not None and analysis_cache.contains(analysis_cache_key(code)):
+            continue
+        if rag_module.count_tokens(code) <= budget:
+            codes.append(code)
+    if codes:
+        print(f"🔥 Embedding {len(codes)} files for retrieval...")
+        rag_module.warm_query_embeddings(codes)
+
+def run_analysis(file_path):
+    """
+    Analyzes a file and returns a report record instead of printing it.
+    """
+    start = time.perf_counter()
+    record = {"file": file_path}
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            result = cached_prompt_llm(f.read(), file_path)
+        record["result"] = result["result"] if isinstance(result, dict) else str(result)
+    except Exception as e:
+        record["error"] = str(e)
+    record["duration"] = round(time.perf_counter() - start, 3)
+    return record
+
+def filter_files(files, pattern, base_dir):
+    """
+    Keeps the files whose path relative to base_dir matches the glob pattern.
+    """
+    return [f for f in files if fnmatch.fnmatch(Path(os.path.relpath(f, base_dir)).as_posix(), pattern)]
+
+def load_checkpoint(report_path):
+    """
+    Returns the files that already have a successful result in the report.
+    """
+    done = set()
+    if not os.path.exists(report_path):
+        return done
+    with open(report_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by an interrupted run
+            if "result" in record:
+                done.add(record["file"])
+    return done
+
+def print_progress(done, total, failed, width=30):
+    filled = int(width * done / total) if total else width
+    bar = "#" * filled + "-" * (width - filled)
+    print(f"\r[{bar}] {done}/{total} analyzed, {failed} failed", end="", flush=True)
+
+def write_markdown_report(report_path, markdown_path):
+    """
+    Renders the latest record of every file in the JSONL report as Markdown.
+    """
+    records = {}
+    with open(report_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["file"]] = record
+
+    with open(markdown_path, "w", encoding="utf-8") as f:
+        f.write("# Code Quality Report\n\n")
+        for file_path in sorted(records):
+            record = records[file_path]
+            f.write(f"## {file_path}\n\n")
+            if "result" in record:
+                f.write(f"{record['result']}\n\n")
+            else:
+                f.write(f"❌ Error: {record['error']}\n\n")
+
+def analyze_batch(files, report_path, concurrency=4, resume=True, prewarm=False):
+    """
+    Analyzes files with up to `concurrency` LLM requests in flight and appends
+    each result to a JSONL report, which also serves as the resume checkpoint.
+    With prewarm the files are embedded for retrieval in batches first.
+    """
+    # Large files are analyzed in parts, which share the same request slots
+    rag_module.set_llm_concurrency(concurrency)
+    done = load_checkpoint(report_path) if resume else set()
+    pending = [f for f in files if f not in done]
+    if done:
+        print(f"⏭️ Skipping {len(files) - len(pending)} files already in {report_path}")
+    if prewarm:
+        warm_retrieval(pending)
+    print(f"🧪 Analyzing {len(pending)} files with {concurrency} concurrent requests...")
+
+    failed = 0
+    mode = "a" if resume else "w"
+    with open(report_path, mode, encoding="utf-8") as report, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_analysis, f) for f in pending]
+        written = set()
+        print_progress(0, len(pending), failed)
+        try:
+            for count, future in enumerate(as_completed(futures), start=1):
+                record = future.result()
+                failed += "error" in record
+                report.write(json.dumps(record) + "\n")
+                report.flush()
+                written.add(future)
+                print_progress(count, len(pending), failed)
+        except (KeyboardInterrupt, SystemExit):
+            # Drop the queued files, only the ones in flight finish and are
+            # written so that resuming does not analyze them again
+            executor.shutdown(wait=False, cancel_futures=True)
+            for future in futures:
+                if future not in written and not future.cancelled():
+                    report.write(json.dumps(future.result()) + "\n")
+            report.flush()
+            raise
+    print(f"\n📄 Report written to {report_path}")
+    if analysis_cache is not None:
+        print(f"💾 {analysis_cache.hits} results served from the analysis cache")
+    return len(pending) - failed, failed
+
 def main():
     parser = argparse.ArgumentParser(description="RAG Code Quality CLI")
     parser.add_argument("--interactive", action="store_true", help="Use interactive file selector")
     parser.add_argument("--file", help="Specify a single file path directly")
+    parser.add_argument("--all", action="store_true", help="Analyze every code file in the dataset")
+    parser.add_argument("--glob", help="Analyze dataset files whose relative path matches a glob, e.g. 'src/*.py'")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent LLM requests in batch mode")
+    parser.add_argument("--report", default="rag_report.jsonl", help="JSONL report and checkpoint for batch mode")
+    parser.add_argument("--markdown", help="Also write the batch report as Markdown to this path")
+    parser.add_argument("--no-resume", action="store_true", help="Start the batch over instead of resuming")
+    parser.add_argument("--no-cache", action="store_true", help="Ask the LLM even for unchanged files")
+    parser.add_argument("--prewarm", action="store_true", help="Embed the batch's files for retrieval in batches first")
+    parser.add_argument("--search", help="Print the indexed chunks most similar to a file, without the LLM")
+    parser.add_argument("-k", type=int, default=5, help="Chunks printed by --search")
 
     args = parser.parse_args()
+    if args.search:
+        search_file(args.search, args.k)
+        return
+
+    global analysis_cache
+    if not args.no_cache:
+        analysis_cache = analysis_cache_module.AnalysisCache(ANALYSIS_CACHE_PATH)
     available_files = list_code_files(DATASET_PATH)
 
+    # Batch mode runs without the interactive menu
+    if args.all or args.glob:
+        files = filter_files(available_files, args.glob, DATASET_PATH) if args.glob else available_files
+        analyze_batch(files, args.report, args.concurrency, resume=not args.no_resume, prewarm=args.prewarm)
+        if args.markdown:
+            write_markdown_report(args.report, args.markdown)
+            print(f"📝 Markdown report written to {args.markdown}")
+        return
+
     # If a single file is specified, analyze it and then enter interactive mode
     if args.file:
         if os.path.isfile(args.file):
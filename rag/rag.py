@@ -1,20 +1,54 @@
+import hashlib
+import importlib.util
 import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-from langchain.chains import RetrievalQA
-from langchain.prompts import PromptTemplate
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import DirectoryLoader
-from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_ollama import ChatOllama
 from dotenv import load_dotenv
 
+indexer_path = (Path(__file__).parent / "indexer.py").resolve()
+spec = importlib.util.spec_from_file_location("indexer_module", indexer_path)
+indexer_module = importlib.util.module_from_spec(spec)
+sys.modules["indexer_module"] = indexer_module
+spec.loader.exec_module(indexer_module)
+
+chunking_path = (Path(__file__).parent / "chunking.py").resolve()
+spec = importlib.util.spec_from_file_location("chunking_module", chunking_path)
+chunking_module = importlib.util.module_from_spec(spec)
+sys.modules["chunking_module"] = chunking_module
+spec.loader.exec_module(chunking_module)
+
+update_index = indexer_module.update_index
+CodeSplitter = chunking_module.CodeSplitter
+index_version = indexer_module.index_version
+count_tokens = chunking_module.count_tokens
+create_embeddings = indexer_module.embeddings_module.create_embeddings
+EMBEDDING_WORKERS = indexer_module.embeddings_module.EMBEDDING_WORKERS
+
 load_dotenv()
 
 DATASET_PATH = os.getenv("DATASET_PATH")
 
 model_name = "llama3.1"
 
+# Tokens the model reads per request, passed to Ollama as num_ctx
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "4096"))
+LLM_MAX_OUTPUT_TOKENS = 512
+RETRIEVED_CHUNKS = 5
+# count_tokens undercounts the model's tokens on long identifiers, so only
+# this share of the context window is planned for
+TOKEN_BUDGET_RATIO = 0.75
+# Parts of a large file analyzed at once, and at most per file
+MAP_REDUCE_CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+MAP_REDUCE_MAX_PARTS = int(os.getenv("MAP_REDUCE_MAX_PARTS", "32"))
+# LLM requests in flight at once across all files and parts, see set_llm_concurrency
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", str(MAP_REDUCE_CONCURRENCY)))
+# Query embeddings kept in memory, keyed by the hash of the code
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
 template = """
 You are an assistant in code quality analysis.
 You need to look for source code quality improvements.
@@ -28,57 +62,133 @@ Source code:
 
 """
 
+part_template = """
+You are an assistant in code quality analysis.
+You need to look for source code quality improvements.
+Suggest a remediation for each identified issue.
+The code below is part {part} of {parts} of a larger file.
+
+DO NOT HALLUCINATE.
+
+Source code:
+
+{code}
+
+"""
+
+merge_template = """
+You are an assistant in code quality analysis.
+Below are the findings for consecutive parts of one source file.
+Merge them into a single report. Keep every distinct issue with its
+remediation, and drop duplicates.
 
-prompt = PromptTemplate(
-    template=template,
-    input_variables=["code"],
-)
+DO NOT HALLUCINATE.
 
+Findings:
+
+{findings}
+
+"""
+
+
+# Built on first use so that importing this module stays cheap
+vectorstore = None
+_vectorstore_lock = threading.Lock()
+qa_chain = None
+_qa_chain_lock = threading.Lock()
+_query_embeddings = OrderedDict()
+_query_embeddings_lock = threading.Lock()
+_prompt = None
+# Every LLM request takes a slot, so nested pools cannot multiply the load on Ollama
+_llm_slots = threading.BoundedSemaphore(LLM_CONCURRENCY)
+
+
+def __getattr__(name):
+    # The prompt template is created lazily, langchain is slow to import
+    if name == "prompt":
+        return get_prompt()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_prompt():
+    global _prompt
+    if _prompt is None:
+        from langchain.prompts import PromptTemplate
+
+        _prompt = PromptTemplate(
+            template=template,
+            input_variables=["code"],
+        )
+    return _prompt
+
+
+def get_faiss_path():
+    project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    return os.path.join(project_root, "faiss_index_")
+
+
+def get_index_version():
+    """
+    Returns the version of the index as saved on disk, without loading it.
+    """
+    return index_version(get_faiss_path())
+
+
+def set_llm_concurrency(concurrency):
+    """
+    Sets how many LLM requests may be in flight at once. Call it before any
+    request is made, e.g. with the batch concurrency.
+    """
+    global _llm_slots
+    _llm_slots = threading.BoundedSemaphore(max(1, concurrency))
+
+
+def create_llm():
+    from langchain_ollama import ChatOllama
+
+    return ChatOllama(model=model_name,
+        num_predict=LLM_MAX_OUTPUT_TOKENS,
+        num_ctx=LLM_CONTEXT_TOKENS,
+        num_gpu=1
+        )
+
+
+def initialize_vectorstore():
+    faiss_path = get_faiss_path()
+
+    # Load embedding model on the best available device
+    embeddings = create_embeddings()
+
+    # Chunk on class and function boundaries and embed only the files
+    # added or changed since the index was last saved
+    text_splitter = CodeSplitter()
+    return update_index(
+        faiss_path, DATASET_PATH, embeddings, text_splitter, workers=EMBEDDING_WORKERS
+    )
+
+
+def get_vectorstore():
+    """
+    Returns the FAISS vector store, loading or updating the index on the first call.
+    """
+    global vectorstore
+    if vectorstore is None:
+        with _vectorstore_lock:
+            if vectorstore is None:
+                vectorstore = initialize_vectorstore()
+    return vectorstore
 
 
 def initialize_qa_chain():
+    from langchain.chains import RetrievalQA
+
     try:
-        project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-        faiss_path = os.path.join(project_root, "faiss_index_")
-
-        # Load embedding model
-        print("Loading embedding model...")
-        embedding_model_name = "sentence-transformers/all-mpnet-base-v2"
-        model_kwargs = {"device": "cuda"}
-        embeddings = HuggingFaceEmbeddings(
-            model_name=embedding_model_name,
-            model_kwargs=model_kwargs
-        )
-        
-        if os.path.exists(faiss_path):
-            print(f"Loading FAISS vector store from {faiss_path}...")
-            persisted_vectorstore = FAISS.load_local(faiss_path, embeddings, allow_dangerous_deserialization=True)
-        else:
-            # Load the dataset using LangChain's DirectoryLoader
-            print(f"Loading documents from {DATASET_PATH}...")
-            loader = DirectoryLoader(DATASET_PATH, glob=["**/*.java", "**/*.py", "**/*.js", "**/*.ts"])
-            documents = loader.load()
-            
-            # Split the document into chunks
-            print("Splitting documents...")
-            text_splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=100, separator="\n")
-            docs = text_splitter.split_documents(documents=documents)
-
-
-            # Create FAISS vector store
-            print("Creating FAISS vector store, this might take a while...")
-            vectorstore = FAISS.from_documents(docs, embeddings)
-
-            vectorstore.save_local(faiss_path)
-            persisted_vectorstore = FAISS.load_local(faiss_path, embeddings, allow_dangerous_deserialization=True)
+        persisted_vectorstore = get_vectorstore()
 
         # Create a retriever
-        retriever = persisted_vectorstore.as_retriever(search_kwargs={"k": 5})
+        retriever = persisted_vectorstore.as_retriever(search_kwargs={"k": RETRIEVED_CHUNKS})
 
-        llm = ChatOllama(model=model_name,
-            num_predict=512,
-            num_gpu=1
-            )
+        llm = create_llm()
 
         # Create Retrieval-Augmented Generation (RAG) system
         return RetrievalQA.from_chain_type(llm=llm, chain_type="stuff" , retriever=retriever)
@@ -88,15 +198,167 @@ def initialize_qa_chain():
     
 
 
-def prompt_llm(code):
+def get_qa_chain():
     """
-    Formats and sends a query to the LLM via RetrievalQA.
+    Returns the QA chain, building it on the first call.
     """
-    print("Querying LLM...")
-    formatted_prompt = prompt.format(code=code)
-    return qa_chain(formatted_prompt, return_only_outputs=True)
+    global qa_chain
+    if qa_chain is None:
+        with _qa_chain_lock:
+            if qa_chain is None:
+                qa_chain = initialize_qa_chain()
+    return qa_chain
 
-    
-qa_chain = initialize_qa_chain()
-   
 
+def embed_query(code):
+    """
+    Returns the embedding of code, computing it only once per distinct code.
+    """
+    key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    with _query_embeddings_lock:
+        if key in _query_embeddings:
+            _query_embeddings.move_to_end(key)
+            return _query_embeddings[key]
+
+    embedding = get_vectorstore().embeddings.embed_query(code)
+    _store_query_embeddings({key: embedding})
+    return embedding
+
+
+def _store_query_embeddings(embeddings):
+    with _query_embeddings_lock:
+        _query_embeddings.update(embeddings)
+        for key in embeddings:
+            _query_embeddings.move_to_end(key)
+        while len(_query_embeddings) > QUERY_EMBEDDING_CACHE_SIZE:
+            _query_embeddings.popitem(last=False)
+
+
+def warm_query_embeddings(codes):
+    """
+    Embeds the codes not cached yet in one batch, which is much faster than
+    embedding them one query at a time.
+    """
+    pending = {}
+    with _query_embeddings_lock:
+        for code in codes:
+            key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+            if key not in _query_embeddings:
+                pending[key] = code
+    if pending:
+        # The embedding model encodes queries and documents alike
+        vectors = get_vectorstore().embeddings.embed_documents(list(pending.values()))
+        _store_query_embeddings(dict(zip(pending, vectors)))
+    return len(pending)
+
+
+def retrieve_documents(code, k=RETRIEVED_CHUNKS):
+    """
+    Returns the k (document, distance) pairs closest to the code, nearest first.
+    """
+    return get_vectorstore().similarity_search_with_score_by_vector(embed_query(code), k=k)
+
+
+def retrieve(code, k=RETRIEVED_CHUNKS):
+    """
+    Returns the k indexed chunks most similar to the code with their source
+    path and distance, lower being closer, without querying the LLM.
+    """
+    return [
+        {"source": doc.metadata.get("source"), "score": float(score), "content": doc.page_content}
+        for doc, score in retrieve_documents(code, k)
+    ]
+
+
+def answer(question, code):
+    """
+    Asks the LLM the question with the chunks retrieved for the code alone
+    as context, so that the template does not skew the retrieval.
+    """
+    documents = [doc for doc, _ in retrieve_documents(code)]
+    chain = get_qa_chain().combine_documents_chain
+    with _llm_slots:
+        return chain.invoke({"input_documents": documents, "question": question})["output_text"]
+
+
+def code_token_budget():
+    """
+    Returns how many tokens of code fit in one request next to the template,
+    the retrieved chunks and the answer.
+    """
+    retrieved = RETRIEVED_CHUNKS * chunking_module.CHUNK_SIZE_TOKENS
+    available = LLM_CONTEXT_TOKENS * TOKEN_BUDGET_RATIO - LLM_MAX_OUTPUT_TOKENS - retrieved
+    return max(1, int(available) - count_tokens(part_template))
+
+
+def group_by_budget(texts, budget):
+    """
+    Groups consecutive texts so that each group fits the token budget. Every
+    group but the last holds at least two texts, so merging always shrinks
+    the list.
+    """
+    groups, current, size = [], [], 0
+    for text in texts:
+        tokens = count_tokens(text)
+        if len(current) >= 2 and size + tokens > budget:
+            groups.append(current)
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def merge_findings(findings, llm):
+    """
+    Merges the findings of a file's parts, in rounds when they do not fit in
+    one request.
+    """
+    budget = int(LLM_CONTEXT_TOKENS * TOKEN_BUDGET_RATIO) - LLM_MAX_OUTPUT_TOKENS - count_tokens(merge_template)
+
+    def merge(group):
+        if len(group) == 1:
+            return group[0]
+        prompt = merge_template.format(findings="\n\n---\n\n".join(group))
+        with _llm_slots:
+            return llm.invoke(prompt).content
+
+    with ThreadPoolExecutor(max_workers=MAP_REDUCE_CONCURRENCY) as executor:
+        while len(findings) > 1:
+            findings = list(executor.map(merge, group_by_budget(findings, budget)))
+    return findings[0]
+
+
+def analyze_large_file(code, source=""):
+    """
+    Analyzes code too large for one request: the parts, split on definition
+    boundaries, are analyzed concurrently and their findings merged.
+    """
+    parts = CodeSplitter(chunk_size=code_token_budget()).split_text(code, source)
+    analyzed = parts[:MAP_REDUCE_MAX_PARTS]
+    print(f"Querying LLM with {len(analyzed)} parts of the file...")
+
+    def analyze_part(number, part):
+        return answer(part_template.format(part=number, parts=len(parts), code=part), part)
+
+    with ThreadPoolExecutor(max_workers=MAP_REDUCE_CONCURRENCY) as executor:
+        findings = list(executor.map(analyze_part, range(1, len(analyzed) + 1), analyzed))
+
+    result = merge_findings(findings, create_llm())
+    if len(parts) > len(analyzed):
+        result += f"\n\nOnly the first {len(analyzed)} of {len(parts)} parts of the file were analyzed."
+    return {"result": result}
+
+
+def prompt_llm(code, source=""):
+    """
+    Formats and sends a query to the LLM with the retrieved context. Code
+    larger than the context window allows is analyzed in parts, see
+    analyze_large_file.
+    """
+    if count_tokens(code) > code_token_budget():
+        return analyze_large_file(code, source)
+    print("Querying LLM...")
+    formatted_prompt = get_prompt().format(code=code)
+    return {"result": answer(formatted_prompt, code)}
@@ -0,0 +1,60 @@
+import sys
+import importlib.util
+from pathlib import Path
+
+cache_path = Path(__file__).resolve().parents[1] / "analysis_cache.py"
+spec = importlib.util.spec_from_file_location("analysis_cache_module", cache_path)
+analysis_cache_module = importlib.util.module_from_spec(spec)
+sys.modules["analysis_cache_module"] = analysis_cache_module
+spec.loader.exec_module(analysis_cache_module)
+
+AnalysisCache = analysis_cache_module.AnalysisCache
+make_key = analysis_cache_module.make_key
+
+
+def test_make_key_depends_on_every_input():
+    """
+    Tests that changing the code, model, template or index changes the key.
+    """
+    key = make_key("code", "llama3.1", "template", "v1")
+    assert key == make_key("code", "llama3.1", "template", "v1")
+    assert key != make_key("other code", "llama3.1", "template", "v1")
+    assert key != make_key("code", "other-model", "template", "v1")
+    assert key != make_key("code", "llama3.1", "other template", "v1")
+    assert key != make_key("code", "llama3.1", "template", "v2")
+
+
+def test_results_persist_across_instances(tmp_path):
+    """
+    Tests that a stored result is found again after reopening the cache.
+    """
+    path = str(tmp_path / "cache.sqlite")
+    cache = AnalysisCache(path)
+    assert cache.get("key") is None
+    cache.put("key", {"result": "Use a context manager"})
+    cache.close()
+
+    cache = AnalysisCache(path)
+    assert cache.get("key") == {"result": "Use a context manager"}
+    assert (cache.hits, cache.misses) == (1, 0)
+    cache.close()
+
+
+def test_least_recently_used_results_are_evicted(tmp_path, monkeypatch):
+    """
+    Tests that the oldest entries go once the size bound is exceeded.
+    """
+    clock = iter(range(100))
+    monkeypatch.setattr(analysis_cache_module.time, "time", lambda: next(clock))
+    entry_size = len('{"result": "xxxxxxxxxx"}')
+    cache = AnalysisCache(str(tmp_path / "cache.sqlite"), max_bytes=2 * entry_size)
+
+    cache.put("a", {"result": "x" * 10})
+    cache.put("b", {"result": "x" * 10})
+    cache.get("a")
+    cache.put("c", {"result": "x" * 10})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    cache.close()
@@ -0,0 +1,117 @@
+import sys
+import importlib.util
+from pathlib import Path
+from langchain_core.documents import Document
+
+chunking_path = Path(__file__).resolve().parents[1] / "chunking.py"
+spec = importlib.util.spec_from_file_location("chunking_module", chunking_path)
+chunking_module = importlib.util.module_from_spec(spec)
+sys.modules["chunking_module"] = chunking_module
+spec.loader.exec_module(chunking_module)
+
+CodeSplitter = chunking_module.CodeSplitter
+
+PYTHON_CODE = '''import os
+
+
+class Config:
+    """Settings"""
+
+    def __init__(self, path):
+        self.path = path
+        self.values = {}
+
+    @property
+    def exists(self):
+        return os.path.exists(self.path)
+
+
+def load(path):
+    return Config(path)
+'''
+
+JAVA_CODE = '''package app;
+
+public class Repository {
+    private final Map<String, User> users = new HashMap<>();
+
+    @Override
+    public String toString() {
+        return "Repository(" + users.size() + ")";
+    }
+
+    public Optional<User> find(String id) {
+        return Optional.ofNullable(users.get(id));
+    }
+}
+'''
+
+TS_CODE = '''export interface User { id: string; name: string }
+
+export class UserService {
+  constructor(private http: HttpClient) {}
+
+  async load(id: string): Promise<User> {
+    return this.http.get(`/users/${id}`);
+  }
+}
+
+export const byName = (a: User, b: User) => a.name.localeCompare(b.name);
+'''
+
+
+def test_count_tokens_counts_words_and_punctuation():
+    assert chunking_module.count_tokens("def f(a, b):") == 8
+
+
+def test_python_is_split_on_definitions_with_decorators_attached():
+    """
+    Tests that methods are chunked whole and keep their decorator.
+    """
+    chunks = CodeSplitter(chunk_size=30).split_text(PYTHON_CODE, "config.py")
+
+    init = "    def __init__(self, path):\n        self.path = path\n        self.values = {}"
+    assert any(chunk.endswith(init) for chunk in chunks)
+    assert any(chunk.startswith("@property\n    def exists(self):") for chunk in chunks)
+    assert chunks[-1] == "def load(path):\n    return Config(path)"
+
+
+def test_java_methods_keep_their_annotations():
+    chunks = CodeSplitter(chunk_size=30).split_text(JAVA_CODE, "Repository.java")
+
+    assert any(chunk.startswith("@Override\n    public String toString() {") for chunk in chunks)
+    assert any(chunk.startswith("public Optional<User> find(String id) {") for chunk in chunks)
+
+
+def test_typescript_is_split_on_declarations():
+    chunks = CodeSplitter(chunk_size=30).split_text(TS_CODE, "user.ts")
+
+    assert chunks[0] == "export interface User { id: string; name: string }"
+    assert any(chunk.startswith("async load(id: string): Promise<User> {") for chunk in chunks)
+    assert chunks[-1].startswith("export const byName")
+
+
+def test_chunks_fit_the_token_budget():
+    chunks = CodeSplitter(chunk_size=20).split_text(PYTHON_CODE * 3, "config.py")
+
+    assert all(chunking_module.count_tokens(chunk) <= 20 for chunk in chunks)
+
+
+def test_small_files_stay_in_one_chunk():
+    assert CodeSplitter().split_text(PYTHON_CODE, "config.py") == [PYTHON_CODE.strip()]
+
+
+def test_split_documents_picks_the_language_from_the_source():
+    """
+    Tests that each document is split with its own language's boundaries and keeps its metadata.
+    """
+    documents = [
+        Document(page_content=PYTHON_CODE, metadata={"source": "data/config.py"}),
+        Document(page_content=JAVA_CODE, metadata={"source": "data/Repository.java"}),
+    ]
+
+    chunks = CodeSplitter(chunk_size=30).split_documents(documents)
+
+    assert {chunk.metadata["source"] for chunk in chunks} == {"data/config.py", "data/Repository.java"}
+    assert any(chunk.page_content.startswith("@Override") for chunk in chunks)
+    assert CodeSplitter(chunk_size=30).signature != CodeSplitter(chunk_size=60).signature
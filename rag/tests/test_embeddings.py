@@ -0,0 +1,58 @@
+import sys
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+import pytest
+
+embeddings_path = Path(__file__).resolve().parents[1] / "embeddings.py"
+spec = importlib.util.spec_from_file_location("embeddings_module", embeddings_path)
+embeddings_module = importlib.util.module_from_spec(spec)
+sys.modules["embeddings_module"] = embeddings_module
+spec.loader.exec_module(embeddings_module)
+
+
+def fake_torch(cuda=False, mps=False):
+    return SimpleNamespace(
+        cuda=SimpleNamespace(is_available=lambda: cuda),
+        backends=SimpleNamespace(mps=SimpleNamespace(is_available=lambda: mps)),
+    )
+
+
+@pytest.mark.parametrize("cuda, mps, expected", [(True, False, "cuda"), (False, True, "mps"), (False, False, "cpu")])
+def test_select_device_auto(monkeypatch, cuda, mps, expected):
+    """
+    Tests that "auto" picks cuda, then mps, then cpu.
+    """
+    monkeypatch.setitem(sys.modules, "torch", fake_torch(cuda, mps))
+    assert embeddings_module.select_device("auto") == expected
+
+
+def test_select_device_explicit(monkeypatch):
+    """
+    Tests that an explicitly requested device is used as is.
+    """
+    monkeypatch.setitem(sys.modules, "torch", fake_torch(cuda=True))
+    assert embeddings_module.select_device("cpu") == "cpu"
+
+
+def test_shard_keeps_order_and_balances():
+    """
+    Tests that shards cover every item in order with sizes differing by at most one.
+    """
+    shards = embeddings_module.shard(list(range(10)), 4)
+    assert [len(s) for s in shards] == [3, 3, 2, 2]
+    assert [i for s in shards for i in s] == list(range(10))
+    assert embeddings_module.shard([1, 2], 8) == [[1], [2]]
+
+
+def test_embed_texts_in_process_for_single_worker_or_gpu(mocker):
+    """
+    Tests that one worker, or a GPU model, embeds in the current process.
+    """
+    pool = mocker.patch.object(embeddings_module, "ProcessPoolExecutor")
+    embeddings = mocker.Mock(model_kwargs={"device": "cuda"})
+    embeddings.embed_documents.return_value = [[0.1], [0.2]]
+
+    assert embeddings_module.embed_texts(["a", "b"], embeddings, workers=4) == [[0.1], [0.2]]
+    assert embeddings_module.embed_texts(["a", "b"], embeddings, workers=1) == [[0.1], [0.2]]
+    pool.assert_not_called()
@@ -0,0 +1,86 @@
+import sys
+import importlib.util
+from pathlib import Path
+import os
+import pytest
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+store_path = Path(__file__).resolve().parents[1] / "index_store.py"
+spec = importlib.util.spec_from_file_location("index_store_module", store_path)
+index_store_module = importlib.util.module_from_spec(spec)
+sys.modules["index_store_module"] = index_store_module
+spec.loader.exec_module(index_store_module)
+
+IndexFormatError = index_store_module.IndexFormatError
+
+
+def make_vectorstore(embeddings, texts):
+    from langchain_community.vectorstores import FAISS
+
+    index = faiss.IndexFlatL2(embeddings.size)
+    vectorstore = FAISS(embeddings, index, index_store_module.new_docstore(), {})
+    vectors = embeddings.embed_documents(texts)
+    metadatas = [{"source": f"{i}.py"} for i in range(len(texts))]
+    vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=[f"id{i}" for i in range(len(texts))])
+    return vectorstore
+
+
+def test_save_and_load_without_pickle(tmp_path):
+    """
+    Tests that an index round-trips through the FAISS binary and SQLite, without a pickle.
+    """
+    embeddings = DeterministicFakeEmbedding(size=8)
+    settings = index_store_module.index_settings(embeddings)
+    vectorstore = make_vectorstore(embeddings, ["def a(): pass", "def b(): pass"])
+    (tmp_path / "index.pkl").write_bytes(b"legacy")
+
+    index_store_module.save_vectorstore(vectorstore, str(tmp_path))
+    loaded = index_store_module.load_vectorstore(str(tmp_path), embeddings, settings, settings)
+
+    assert sorted(os.listdir(tmp_path)) == ["docstore.sqlite", "index.faiss"]
+    assert loaded.index_to_docstore_id == {0: "id0", 1: "id1"}
+    doc = loaded.similarity_search("def b(): pass", k=1)[0]
+    assert (doc.page_content, doc.metadata) == ("def b(): pass", {"source": "1.py"})
+
+
+def test_load_rejects_mismatched_index(tmp_path):
+    """
+    Tests that an index saved in another format, or with other embeddings, is not loaded.
+    """
+    embeddings = DeterministicFakeEmbedding(size=8)
+    settings = index_store_module.index_settings(embeddings)
+    index_store_module.save_vectorstore(make_vectorstore(embeddings, ["x = 1"]), str(tmp_path))
+
+    with pytest.raises(IndexFormatError, match="dimension is 8, expected 16"):
+        index_store_module.load_vectorstore(
+            str(tmp_path), DeterministicFakeEmbedding(size=16), settings,
+            index_store_module.index_settings(DeterministicFakeEmbedding(size=16)),
+        )
+    with pytest.raises(IndexFormatError, match="format"):
+        index_store_module.load_vectorstore(str(tmp_path), embeddings, {**settings, "format": 0}, settings)
+    with pytest.raises(IndexFormatError, match="no manifest"):
+        index_store_module.load_vectorstore(str(tmp_path), embeddings, None, settings)
+
+
+def test_docstore_changes_are_written_to_a_new_file(tmp_path):
+    """
+    Tests that added and deleted documents are saved without touching the file being read.
+    """
+    embeddings = DeterministicFakeEmbedding(size=8)
+    original = tmp_path / "original"
+    index_store_module.save_vectorstore(make_vectorstore(embeddings, ["a", "b"]), str(original))
+    docstore = index_store_module.new_docstore(str(original / "docstore.sqlite"))
+
+    docstore.delete(["id0"])
+    docstore.add({"id2": Document(page_content="c", metadata={"source": "2.py"})})
+    docstore.write(str(tmp_path / "updated.sqlite"), {0: "id1", 1: "id2"})
+
+    assert docstore.search("id0") == "ID id0 not found."
+    assert index_store_module.new_docstore(str(original / "docstore.sqlite")).search("id0").page_content == "a"
+    updated = index_store_module.new_docstore(str(tmp_path / "updated.sqlite"))
+    assert updated.positions() == {0: "id1", 1: "id2"}
+    assert [updated.search(doc_id).page_content for doc_id in ["id1", "id2"]] == ["b", "c"]
+    assert updated.search("id0") == "ID id0 not found."
@@ -0,0 +1,241 @@
+import sys
+import importlib.util
+from pathlib import Path
+import os
+import pytest
+import faiss
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain.text_splitter import CharacterTextSplitter
+
+indexer_path = Path(__file__).resolve().parents[1] / "indexer.py"
+spec = importlib.util.spec_from_file_location("indexer_module", indexer_path)
+indexer_module = importlib.util.module_from_spec(spec)
+sys.modules["indexer_module"] = indexer_module
+spec.loader.exec_module(indexer_module)
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    """Fake embeddings that remember which texts were embedded."""
+    embedded: list = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Creates a small code dataset and returns (dataset path, index path)."""
+    data = tmp_path / "data"
+    (data / "pkg").mkdir(parents=True)
+    (data / "a.py").write_text("def a():\n    return 1\n")
+    (data / "pkg" / "b.js").write_text("function b() { return 2; }\n")
+    (data / "notes.txt").write_text("not code")
+    return str(data), str(tmp_path / "index")
+
+
+def build(dataset, embeddings):
+    data, index = dataset
+    splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=0, separator="\n")
+    return indexer_module.update_index(index, data, embeddings, splitter)
+
+
+def sources(vectorstore):
+    docs = [vectorstore.docstore.search(doc_id) for doc_id in vectorstore.index_to_docstore_id.values()]
+    return sorted(Path(doc.metadata["source"]).name for doc in docs)
+
+
+def test_update_index_builds_index_and_manifest(dataset):
+    """
+    Tests that the first run embeds every code file and writes a manifest.
+    """
+    embeddings = CountingEmbeddings(size=8, embedded=[])
+    vectorstore = build(dataset, embeddings)
+
+    assert sources(vectorstore) == ["a.py", "b.js"]
+    manifest = indexer_module.load_manifest(dataset[1])
+    assert sorted(manifest["files"]) == ["a.py", "pkg/b.js"]
+    assert all(info["ids"] and info["sha256"] for info in manifest["files"].values())
+
+
+def test_update_index_skips_unchanged_files(dataset):
+    """
+    Tests that a second run with no changes embeds nothing.
+    """
+    build(dataset, CountingEmbeddings(size=8, embedded=[]))
+    embeddings = CountingEmbeddings(size=8, embedded=[])
+
+    vectorstore = build(dataset, embeddings)
+
+    assert embeddings.embedded == []
+    assert sources(vectorstore) == ["a.py", "b.js"]
+
+
+def test_update_index_reembeds_modified_and_drops_removed(dataset):
+    """
+    Tests that only modified files are embedded again and removed files lose their vectors.
+    """
+    data, index = dataset
+    build(dataset, CountingEmbeddings(size=8, embedded=[]))
+
+    Path(data, "a.py").write_text("def a():\n    return 42\n")
+    os.remove(os.path.join(data, "pkg", "b.js"))
+    embeddings = CountingEmbeddings(size=8, embedded=[])
+
+    vectorstore = build(dataset, embeddings)
+
+    assert embeddings.embedded == ["def a():\n    return 42"]
+    assert sources(vectorstore) == ["a.py"]
+    assert vectorstore.index.ntotal == 1
+    assert sorted(indexer_module.load_manifest(index)["files"]) == ["a.py"]
+
+
+def test_update_index_ignores_touched_but_identical_files(dataset):
+    """
+    Tests that a changed mtime with identical content does not trigger re-embedding.
+    """
+    data, index = dataset
+    build(dataset, CountingEmbeddings(size=8, embedded=[]))
+    os.utime(os.path.join(data, "a.py"), (1, 1))
+    embeddings = CountingEmbeddings(size=8, embedded=[])
+
+    build(dataset, embeddings)
+
+    assert embeddings.embedded == []
+    assert indexer_module.load_manifest(index)["files"]["a.py"]["mtime"] == 1
+
+
+def test_index_version_changes_with_the_index(dataset):
+    """
+    Tests that the index version is stable until the content of the indexed files changes.
+    """
+    assert indexer_module.index_version(dataset[1]) is None
+    build(dataset, CountingEmbeddings(size=8, embedded=[]))
+    version = indexer_module.index_version(dataset[1])
+
+    build(dataset, CountingEmbeddings(size=8, embedded=[]))
+    assert indexer_module.index_version(dataset[1]) == version
+
+    os.utime(Path(dataset[0]) / "a.py", (2, 2))
+    build(dataset, CountingEmbeddings(size=8, embedded=[]))
+    assert indexer_module.load_manifest(dataset[1])["files"]["a.py"]["mtime"] == 2
+    assert indexer_module.index_version(dataset[1]) == version
+
+    (Path(dataset[0]) / "a.py").write_text("def a():\n    return 3\n")
+    build(dataset, CountingEmbeddings(size=8, embedded=[]))
+    assert indexer_module.index_version(dataset[1]) != version
+
+
+def test_update_index_rebuilds_when_splitter_changes(dataset):
+    """
+    Tests that an index chunked by another splitter is rebuilt from scratch.
+    """
+    data, index = dataset
+    build(dataset, CountingEmbeddings(size=8, embedded=[]))
+    embeddings = CountingEmbeddings(size=8, embedded=[])
+    splitter = CharacterTextSplitter(chunk_size=200, chunk_overlap=0, separator="\n")
+
+    vectorstore = indexer_module.update_index(index, data, embeddings, splitter)
+
+    assert len(embeddings.embedded) == 2
+    assert vectorstore.index.ntotal == 2
+    assert indexer_module.load_manifest(index)["splitter"] == "CharacterTextSplitter:200:0"
+
+
+@pytest.fixture
+def larger_dataset(tmp_path):
+    """Creates enough single-chunk files to train a small IVF index."""
+    data = tmp_path / "data"
+    data.mkdir()
+    for i in range(40):
+        (data / f"m{i}.py").write_text(f"def f{i}():\n    return {i}\n")
+    return str(data), str(tmp_path / "index")
+
+
+def update(dataset, embeddings, **kwargs):
+    data, index = dataset
+    splitter = CharacterTextSplitter(chunk_size=500, chunk_overlap=0, separator="\n")
+    return indexer_module.update_index(index, data, embeddings, splitter, **kwargs)
+
+
+def test_update_index_builds_ivf_index(larger_dataset):
+    """
+    Tests that an IVF index is trained, searchable and recorded in the manifest.
+    """
+    vectorstore = update(larger_dataset, CountingEmbeddings(size=8, embedded=[]), index_factory="IVF4,Flat")
+
+    ivf = faiss.try_extract_index_ivf(vectorstore.index)
+    assert ivf is not None and ivf.nprobe == indexer_module.FAISS_NPROBE
+    assert vectorstore.index.ntotal == 40
+    assert vectorstore.similarity_search("def f3():\n    return 3", k=1)[0].page_content == "def f3():\n    return 3"
+    assert indexer_module.load_manifest(larger_dataset[1])["index_factory"] == "IVF4,Flat"
+
+
+def test_update_index_rebuilds_when_index_factory_changes(larger_dataset):
+    """
+    Tests that switching the index type embeds the whole dataset again.
+    """
+    update(larger_dataset, CountingEmbeddings(size=8, embedded=[]))
+    embeddings = CountingEmbeddings(size=8, embedded=[])
+
+    vectorstore = update(larger_dataset, embeddings, index_factory="HNSW8")
+
+    assert len(embeddings.embedded) == 40
+    assert hasattr(faiss.downcast_index(vectorstore.index), "hnsw")
+
+
+def test_update_index_removes_vectors_from_hnsw_index(larger_dataset):
+    """
+    Tests that HNSW indexes, which cannot delete vectors, are rebuilt without the stale ones.
+    """
+    data, index = larger_dataset
+    update(larger_dataset, CountingEmbeddings(size=8, embedded=[]), index_factory="HNSW8")
+    os.remove(os.path.join(data, "m0.py"))
+    (Path(data) / "m1.py").write_text("def f1():\n    return 100\n")
+    embeddings = CountingEmbeddings(size=8, embedded=[])
+
+    vectorstore = update(larger_dataset, embeddings, index_factory="HNSW8")
+
+    assert embeddings.embedded == ["def f1():\n    return 100"]
+    assert vectorstore.index.ntotal == 39
+    assert "m0.py" not in sources(vectorstore)
+    assert vectorstore.similarity_search("def f1():\n    return 100", k=1)[0].page_content == "def f1():\n    return 100"
+    assert vectorstore.similarity_search("def f7():\n    return 7", k=1)[0].page_content == "def f7():\n    return 7"
+
+
+def test_update_index_memory_maps_saved_index(larger_dataset):
+    """
+    Tests that with mmap the index is served read-only and still updated when files change.
+    """
+    data, _ = larger_dataset
+    update(larger_dataset, CountingEmbeddings(size=8, embedded=[]), index_factory="IVF4,Flat")
+
+    vectorstore = update(larger_dataset, CountingEmbeddings(size=8, embedded=[]), index_factory="IVF4,Flat", mmap=True)
+    assert vectorstore.similarity_search("def f5():\n    return 5", k=1)[0].page_content == "def f5():\n    return 5"
+
+    (Path(data) / "m5.py").write_text("def f5():\n    return 500\n")
+    vectorstore = update(larger_dataset, CountingEmbeddings(size=8, embedded=[]), index_factory="IVF4,Flat", mmap=True)
+    assert vectorstore.index.ntotal == 40
+    assert vectorstore.similarity_search("def f5():\n    return 500", k=1)[0].page_content == "def f5():\n    return 500"
+
+
+def test_update_index_rebuilds_pickled_index(dataset):
+    """
+    Tests that an index saved by FAISS.save_local is rebuilt in the current format.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    data, index = dataset
+    build(dataset, CountingEmbeddings(size=8, embedded=[]))
+    FAISS.from_texts(["def a():\n    return 1"], DeterministicFakeEmbedding(size=8)).save_local(index)
+    manifest = indexer_module.load_manifest(index)
+    del manifest["format"]
+    indexer_module.save_manifest(index, manifest)
+    embeddings = CountingEmbeddings(size=8, embedded=[])
+
+    vectorstore = build(dataset, embeddings)
+
+    assert len(embeddings.embedded) == 2
+    assert not os.path.exists(os.path.join(index, "index.pkl"))
+    assert indexer_module.load_manifest(index)["format"] == indexer_module.index_store_module.INDEX_FORMAT_VERSION
+    assert sources(vectorstore) == ["a.py", "b.js"]
@@ -4,6 +4,8 @@ from pathlib import Path
 import pytest
 import tempfile
 import os
+import json
+import threading
 
 main_path = Path(__file__).resolve().parents[1] / "main.py"
 spec = importlib.util.spec_from_file_location("main_module", main_path)
@@ -12,6 +14,14 @@ sys.modules["main_module"] = main_module
 spec.loader.exec_module(main_module)
 
 
+@pytest.fixture(autouse=True)
+def isolated_analysis_cache(monkeypatch, tmp_path):
+    """Keeps main() from opening the real analysis cache."""
+    monkeypatch.setattr(main_module, "ANALYSIS_CACHE_PATH", str(tmp_path / "analysis_cache.sqlite"))
+    monkeypatch.setattr(main_module, "analysis_cache", None)
+    monkeypatch.setattr(main_module.rag_module, "get_vectorstore", lambda: None)
+
+
 @pytest.fixture
 def temp_py_file():
     """Fixture to create a temporary Python file."""
@@ -71,7 +81,7 @@ def test_analyze_file_success(monkeypatch, capsys, temp_py_file):
     """
     Tests that analyze_file prints the analysis result for valid input.
     """
-    monkeypatch.setattr(main_module, "prompt_llm", lambda code: f"Analysis of: {code}")
+    monkeypatch.setattr(main_module, "prompt_llm", lambda code, source="": f"Analysis of: {code}")
     main_module.analyze_file(temp_py_file)
     captured = capsys.readouterr()
     assert "🧪 Analyzing" in captured.out
@@ -97,7 +107,7 @@ def test_main_runs_single_file_mode(monkeypatch, capsys):
         tmp_path = tmp.name
 
     monkeypatch.setattr(sys, "argv", ["main.py", "--file", tmp_path])
-    monkeypatch.setattr(main_module, "prompt_llm", lambda code: "Mocked Result")
+    monkeypatch.setattr(main_module, "prompt_llm", lambda code, source="": "Mocked Result")
     monkeypatch.setattr(main_module, "select_file_or_action", lambda x: "Quit Program")
     monkeypatch.setattr(main_module, "list_code_files", lambda x: [tmp_path])
 
@@ -187,3 +197,191 @@ def test_signal_handler_exits_gracefully(capsys):
         main_module.signal_handler(None, None)
     captured = capsys.readouterr()
     assert "👋 Interrupted by user. Exiting program. Goodbye!" in captured.out
+
+
+def test_analyze_batch_writes_report_and_resumes(monkeypatch, tmp_path):
+    """
+    Tests that batch mode records every file and skips files already analyzed on resume.
+    """
+    files = []
+    for name in ["a.py", "b.py", "c.py"]:
+        path = tmp_path / name
+        path.write_text(f"# {name}")
+        files.append(str(path))
+    report = str(tmp_path / "report.jsonl")
+
+    analyzed = []
+
+    def fake_prompt_llm(code, source=""):
+        analyzed.append(code)
+        if "b.py" in code:
+            raise RuntimeError("LLM down")
+        return {"result": f"ok {code}"}
+
+    monkeypatch.setattr(main_module, "prompt_llm", fake_prompt_llm)
+
+    assert main_module.analyze_batch(files, report, concurrency=2) == (2, 1)
+    assert sorted(analyzed) == ["# a.py", "# b.py", "# c.py"]
+
+    # Only the failed file is analyzed again
+    analyzed.clear()
+    main_module.analyze_batch(files, report, concurrency=2)
+    assert analyzed == ["# b.py"]
+
+    with open(report) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 4
+    assert any(r["file"] == files[0] and r.get("result") == "ok # a.py" for r in records)
+    assert records[-1]["file"] == files[1] and records[-1]["error"] == "LLM down"
+
+
+def test_analyze_batch_interrupt_cancels_queued_files(monkeypatch, tmp_path):
+    """
+    Tests that interrupting a batch skips the queued files and still records the finished ones.
+    """
+    files = []
+    for index in range(10):
+        path = tmp_path / f"f{index}.py"
+        path.write_text(f"# f{index}.py")
+        files.append(str(path))
+    report = str(tmp_path / "report.jsonl")
+
+    analyzed = []
+    interrupt = threading.Event()
+
+    def fake_prompt_llm(code, source=""):
+        analyzed.append(code)
+        if len(analyzed) > 1:
+            # The next file is still in flight when Ctrl-C arrives
+            interrupt.wait(5)
+        return {"result": f"ok {code}"}
+
+    as_completed = main_module.as_completed
+
+    def interrupted(futures):
+        yield next(as_completed(futures))
+        interrupt.set()
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(main_module, "prompt_llm", fake_prompt_llm)
+    monkeypatch.setattr(main_module, "as_completed", interrupted)
+
+    with pytest.raises(KeyboardInterrupt):
+        main_module.analyze_batch(files, report, concurrency=1)
+    assert analyzed in (["# f0.py"], ["# f0.py", "# f1.py"])
+
+    with open(report) as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r["result"] for r in records) == sorted(f"ok {code}" for code in analyzed)
+
+
+def test_main_glob_mode_writes_markdown(monkeypatch, tmp_path):
+    """
+    Tests that --glob analyzes only matching files and renders a Markdown report.
+    """
+    (tmp_path / "src").mkdir()
+    keep = tmp_path / "src" / "keep.py"
+    skip = tmp_path / "other.py"
+    keep.write_text("keep")
+    skip.write_text("skip")
+    report = tmp_path / "report.jsonl"
+    markdown = tmp_path / "report.md"
+
+    monkeypatch.setattr(main_module, "DATASET_PATH", str(tmp_path))
+    monkeypatch.setattr(main_module, "prompt_llm", lambda code, source="": {"result": f"Looks fine: {code}"})
+    monkeypatch.setattr(sys, "argv", [
+        "main.py", "--glob", "src/*.py", "--report", str(report), "--markdown", str(markdown)
+    ])
+
+    main_module.main()
+
+    content = markdown.read_text()
+    assert f"## {keep}" in content
+    assert "Looks fine: keep" in content
+    assert str(skip) not in content
+
+
+def test_cached_prompt_llm_reuses_result_for_unchanged_code(monkeypatch, tmp_path):
+    """
+    Tests that the LLM is asked once per code, model and index version.
+    """
+    calls = []
+    def fake_prompt_llm(code, source=""):
+        calls.append(code)
+        return {"result": f"Analysis of: {code}"}
+
+    monkeypatch.setattr(main_module, "prompt_llm", fake_prompt_llm)
+    monkeypatch.setattr(main_module.rag_module, "get_index_version", lambda: "v1")
+    cache = main_module.analysis_cache_module.AnalysisCache(str(tmp_path / "cache.sqlite"))
+    monkeypatch.setattr(main_module, "analysis_cache", cache)
+
+    assert main_module.cached_prompt_llm("a = 1") == {"result": "Analysis of: a = 1"}
+    assert main_module.cached_prompt_llm("a = 1") == {"result": "Analysis of: a = 1"}
+    main_module.cached_prompt_llm("a = 2")
+    assert calls == ["a = 1", "a = 2"]
+
+    monkeypatch.setattr(main_module.rag_module, "get_index_version", lambda: "v2")
+    main_module.cached_prompt_llm("a = 1")
+    monkeypatch.setattr(main_module.rag_module, "model_name", "other-model")
+    main_module.cached_prompt_llm("a = 1")
+    assert calls == ["a = 1", "a = 2", "a = 1", "a = 1"]
+    cache.close()
+
+
+def test_analysis_cache_key_uses_the_updated_index(monkeypatch):
+    """
+    Tests that the index is updated before its version goes into the key, and
+    that every template of the analysis is part of the key.
+    """
+    versions = ["old"]
+    monkeypatch.setattr(main_module.rag_module, "get_vectorstore", lambda: versions.append("new"))
+    monkeypatch.setattr(main_module.rag_module, "get_index_version", lambda: versions[-1])
+
+    key = main_module.analysis_cache_key("a = 1")
+
+    assert key == main_module.analysis_cache_module.make_key(
+        "a = 1", main_module.rag_module.model_name,
+        main_module.rag_module.template + main_module.rag_module.part_template + main_module.rag_module.merge_template,
+        "new",
+    )
+    monkeypatch.setattr(main_module.rag_module, "merge_template", "Merge differently\n{findings}")
+    assert main_module.analysis_cache_key("a = 1") != key
+
+
+def test_main_search_mode_prints_chunks_without_llm(monkeypatch, capsys, temp_py_file):
+    """
+    Tests that --search prints the retrieved chunks and never calls the LLM.
+    """
+    monkeypatch.setattr(main_module.rag_module, "retrieve", lambda code, k: [
+        {"source": "data/x.py", "score": 0.125, "content": "def x(): pass"},
+    ][:k])
+    monkeypatch.setattr(main_module, "prompt_llm", lambda code, source="": pytest.fail("LLM called"))
+    monkeypatch.setattr(sys, "argv", ["main.py", "--search", temp_py_file, "-k", "1"])
+
+    main_module.main()
+
+    output = capsys.readouterr().out
+    assert "1. data/x.py (distance 0.1250)" in output
+    assert "def x(): pass" in output
+
+
+def test_warm_retrieval_skips_cached_and_large_files(monkeypatch, tmp_path):
+    """
+    Tests that only files the batch will send whole to the LLM are embedded ahead.
+    """
+    small, cached, large = tmp_path / "small.py", tmp_path / "cached.py", tmp_path / "large.py"
+    small.write_text("a = 1")
+    cached.write_text("b = 2")
+    large.write_text("c = 3 + 4 + 5 + 6")
+    monkeypatch.setattr(main_module.rag_module, "get_index_version", lambda: "v1")
+    monkeypatch.setattr(main_module.rag_module, "code_token_budget", lambda: 5)
+    cache = main_module.analysis_cache_module.AnalysisCache(str(tmp_path / "cache.sqlite"))
+    cache.put(main_module.analysis_cache_key("b = 2"), {"result": "fine"})
+    monkeypatch.setattr(main_module, "analysis_cache", cache)
+    warmed = []
+    monkeypatch.setattr(main_module.rag_module, "warm_query_embeddings", warmed.extend)
+
+    main_module.warm_retrieval([str(small), str(cached), str(large), str(tmp_path / "missing.py")])
+
+    assert warmed == ["a = 1"]
+    cache.close()
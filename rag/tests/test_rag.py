@@ -3,6 +3,9 @@ import importlib.util
 from pathlib import Path
 import pytest
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 rag_path = Path(__file__).resolve().parents[1] / "rag.py"
 spec = importlib.util.spec_from_file_location("rag_module", rag_path)
@@ -16,29 +19,21 @@ def mock_llm_pipeline(mocker, tmp_path):
     """
     Patches all common dependencies in initialize_qa_chain for reuse in multiple tests.
     """
-    mocker.patch("os.path.exists", return_value=False)
-
-    mock_loader = mocker.patch.object(rag_module, "DirectoryLoader")
-    mock_loader.return_value.load.return_value = [{"page_content": "code"}]
-
-    mock_splitter = mocker.patch.object(rag_module, "CharacterTextSplitter")
-    mock_splitter.return_value.split_documents.return_value = ["chunk1", "chunk2"]
+    mocker.patch.object(rag_module, "vectorstore", None)
+    mock_splitter = mocker.patch.object(rag_module, "CodeSplitter")
 
     mock_embeddings = mocker.Mock()
-    mocker.patch.object(rag_module, "HuggingFaceEmbeddings", return_value=mock_embeddings)
+    mocker.patch.object(rag_module, "create_embeddings", return_value=mock_embeddings)
 
     mock_vectorstore = mocker.Mock()
     mock_vectorstore.as_retriever.return_value = "mock_retriever"
 
-    mock_faiss = mocker.patch.object(rag_module, "FAISS")
-    mock_faiss.from_documents.return_value = mock_vectorstore
-    mock_faiss.load_local.return_value = mock_vectorstore
-    mock_vectorstore.save_local.return_value = None
+    mock_update_index = mocker.patch.object(rag_module, "update_index", return_value=mock_vectorstore)
 
     mock_llm = mocker.Mock()
-    mocker.patch.object(rag_module, "ChatOllama", return_value=mock_llm)
+    mocker.patch("langchain_ollama.ChatOllama", return_value=mock_llm)
 
-    mock_qa = mocker.patch.object(rag_module, "RetrievalQA")
+    mock_qa = mocker.patch("langchain.chains.RetrievalQA")
     mock_qa.from_chain_type.return_value = "mock_qa_chain"
 
     real_path_join = os.path.join
@@ -52,50 +47,73 @@ def mock_llm_pipeline(mocker, tmp_path):
     mocker.patch("os.path.join", side_effect=safe_path_join)
 
     return {
-        "mock_faiss": mock_faiss,
+        "mock_update_index": mock_update_index,
+        "mock_splitter": mock_splitter,
+        "mock_embeddings": mock_embeddings,
         "mock_qa": mock_qa,
         "mock_vectorstore": mock_vectorstore,
         "mock_llm": mock_llm,
     }
 
 
-def test_prompt_llm_formats_and_calls_chain(mocker):
+@pytest.fixture
+def mock_answer_chain(mocker):
     """
-    Tests that prompt_llm formats the code and calls qa_chain with it.
+    Patches retrieval and the QA chain, returns the mock that answers questions.
     """
+    mock_retrieve = mocker.patch.object(
+        rag_module, "retrieve_documents", return_value=[(mocker.Mock(page_content="context"), 0.5)]
+    )
     mock_chain = mocker.patch.object(rag_module, "qa_chain")
-    mock_chain.return_value = {"result": "Analysis complete"}
+    mock_invoke = mock_chain.combine_documents_chain.invoke
+    mock_invoke.return_value = {"output_text": "Analysis complete"}
+    mock_invoke.retrieve = mock_retrieve
+    return mock_invoke
+
 
+def test_prompt_llm_formats_and_calls_chain(mock_answer_chain):
+    """
+    Tests that prompt_llm retrieves context for the code and asks the chain the formatted prompt.
+    """
     code = "def foo(): pass"
     result = rag_module.prompt_llm(code)
 
     expected_prompt = rag_module.prompt.format(code=code)
-    mock_chain.assert_called_once_with(expected_prompt, return_only_outputs=True)
+    mock_answer_chain.retrieve.assert_called_once_with(code)
+    mock_answer_chain.assert_called_once()
+    inputs = mock_answer_chain.call_args.args[0]
+    assert inputs["question"] == expected_prompt
+    assert [doc.page_content for doc in inputs["input_documents"]] == ["context"]
     assert result == {"result": "Analysis complete"}
 
 
 def test_initialize_qa_chain_creates_index_and_returns_chain(mock_llm_pipeline):
     """
-    Tests that initialize_qa_chain creates a FAISS index and returns a QA chain.
+    Tests that initialize_qa_chain updates the FAISS index and returns a QA chain.
     """
     result = rag_module.initialize_qa_chain()
 
     assert result == "mock_qa_chain"
-    mock_llm_pipeline["mock_faiss"].from_documents.assert_called_once()
+    mock_llm_pipeline["mock_update_index"].assert_called_once()
     mock_llm_pipeline["mock_qa"].from_chain_type.assert_called_once_with(
         llm=mock_llm_pipeline["mock_llm"], chain_type="stuff", retriever="mock_retriever"
     )
 
 
-def test_initialize_qa_chain_loads_existing_index(mock_llm_pipeline, mocker):
+def test_initialize_qa_chain_updates_index_incrementally(mock_llm_pipeline, tmp_path):
     """
-    Tests that initialize_qa_chain loads an existing FAISS index if available.
+    Tests that initialize_qa_chain hands the index path, dataset and embeddings to update_index.
     """
-    mocker.patch("os.path.exists", return_value=True)
-
     result = rag_module.initialize_qa_chain()
 
     assert result == "mock_qa_chain"
+    mock_llm_pipeline["mock_update_index"].assert_called_once_with(
+        str(tmp_path / "fake_faiss_index"),
+        rag_module.DATASET_PATH,
+        mock_llm_pipeline["mock_embeddings"],
+        mock_llm_pipeline["mock_splitter"].return_value,
+        workers=rag_module.EMBEDDING_WORKERS,
+    )
     mock_llm_pipeline["mock_qa"].from_chain_type.assert_called_once_with(
         llm=mock_llm_pipeline["mock_llm"], chain_type="stuff", retriever="mock_retriever"
     )
@@ -105,10 +123,172 @@ def test_initialize_qa_chain_error_handling(mocker, capsys):
     """
     Tests that initialize_qa_chain prints and raises exception on failure.
     """
-    mocker.patch("os.path.exists", side_effect=RuntimeError("Mocked init failure"))
+    mocker.patch.object(rag_module, "create_embeddings", side_effect=RuntimeError("Mocked init failure"))
 
     with pytest.raises(RuntimeError):
         rag_module.initialize_qa_chain()
 
     captured = capsys.readouterr()
     assert "Initialization failed: Mocked init failure" in captured.out
+
+
+def test_import_does_not_build_chain():
+    """
+    Tests that importing rag.py leaves the QA chain unbuilt.
+    """
+    spec = importlib.util.spec_from_file_location("fresh_rag_module", rag_path)
+    fresh_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fresh_module)
+
+    assert fresh_module.qa_chain is None
+
+
+def test_get_qa_chain_builds_once(mocker):
+    """
+    Tests that get_qa_chain builds the chain on the first call and reuses it afterwards.
+    """
+    mocker.patch.object(rag_module, "qa_chain", None)
+    mock_init = mocker.patch.object(rag_module, "initialize_qa_chain", return_value="chain")
+
+    assert rag_module.get_qa_chain() == "chain"
+    assert rag_module.get_qa_chain() == "chain"
+    mock_init.assert_called_once()
+
+
+LARGE_CODE = "\n\n".join(f"def f{i}(x):\n    return x + {i}" for i in range(6))
+
+
+def test_prompt_llm_analyzes_large_code_in_parts(mocker, mock_answer_chain):
+    """
+    Tests that code over the token budget is analyzed per part and the findings merged.
+    """
+    mocker.patch.object(rag_module, "code_token_budget", return_value=30)
+    mock_answer_chain.side_effect = lambda inputs: {"output_text": f"finding {inputs['question'].count('def ')}"}
+    mock_llm = mocker.Mock()
+    mock_llm.invoke.return_value.content = "merged report"
+    mocker.patch.object(rag_module, "create_llm", return_value=mock_llm)
+
+    result = rag_module.prompt_llm(LARGE_CODE, "funcs.py")
+
+    assert result == {"result": "merged report"}
+    prompts = [call.args[0]["question"] for call in mock_answer_chain.call_args_list]
+    assert len(prompts) > 1
+    assert all(f"of {len(prompts)} of a larger file" in prompt for prompt in prompts)
+    assert all(f"def f{i}(x):\n    return x + {i}" in "".join(prompts) for i in range(6))
+    assert "finding" in mock_llm.invoke.call_args.args[0]
+
+
+def test_prompt_llm_caps_the_number_of_parts(mocker, mock_answer_chain):
+    """
+    Tests that at most MAP_REDUCE_MAX_PARTS parts are analyzed and the result says so.
+    """
+    mocker.patch.object(rag_module, "code_token_budget", return_value=12)
+    mocker.patch.object(rag_module, "MAP_REDUCE_MAX_PARTS", 2)
+    mock_llm = mocker.Mock()
+    mock_llm.invoke.return_value.content = "merged report"
+    mocker.patch.object(rag_module, "create_llm", return_value=mock_llm)
+
+    result = rag_module.prompt_llm(LARGE_CODE, "funcs.py")
+
+    assert mock_answer_chain.call_count == 2
+    assert result["result"] == "merged report\n\nOnly the first 2 of 6 parts of the file were analyzed."
+
+
+def test_llm_requests_share_one_concurrency_limit(mocker, mock_answer_chain):
+    """
+    Tests that large files analyzed at the same time never have more LLM requests in flight than the limit.
+    """
+    mocker.patch.object(rag_module, "code_token_budget", return_value=12)
+    mocker.patch.object(rag_module, "_llm_slots", rag_module._llm_slots)
+    rag_module.set_llm_concurrency(2)
+    lock, in_flight, peak = threading.Lock(), [0], [0]
+
+    def slow_request(result):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return result
+
+    mock_answer_chain.side_effect = lambda inputs: slow_request({"output_text": "finding"})
+    mock_llm = mocker.Mock()
+    mock_llm.invoke.side_effect = lambda prompt: slow_request(mocker.Mock(content="merged report"))
+    mocker.patch.object(rag_module, "create_llm", return_value=mock_llm)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: rag_module.prompt_llm(LARGE_CODE, "funcs.py"), range(4)))
+
+    assert all(result == {"result": "merged report"} for result in results)
+    assert peak[0] == 2
+
+
+def test_group_by_budget_keeps_at_least_two_per_group():
+    """
+    Tests that a group is closed at the budget only once it holds two texts.
+    """
+    groups = rag_module.group_by_budget(["a b c", "d e f", "g", "h i j k l m"], budget=4)
+
+    assert groups == [["a b c", "d e f"], ["g", "h i j k l m"]]
+
+
+def test_merge_findings_merges_in_rounds(mocker):
+    """
+    Tests that findings over the budget are merged group by group until one remains.
+    """
+    mocker.patch.object(rag_module, "LLM_CONTEXT_TOKENS", 1000)
+    mocker.patch.object(rag_module, "LLM_MAX_OUTPUT_TOKENS", 500)
+    mock_llm = mocker.Mock()
+    mock_llm.invoke.side_effect = lambda prompt: mocker.Mock(content=f"merged {prompt.count('---') + 1}")
+
+    findings = [" ".join(["word"] * 80) for _ in range(8)]
+    result = rag_module.merge_findings(findings, mock_llm)
+
+    assert result.startswith("merged")
+    assert mock_llm.invoke.call_count > 1
+
+
+def test_retrieve_returns_chunks_with_scores_and_sources(mocker):
+    """
+    Tests that retrieve searches with the embedding of the code alone and skips the LLM.
+    """
+    mock_store = mocker.Mock()
+    mock_store.embeddings.embed_query.return_value = [0.1, 0.2]
+    mock_store.similarity_search_with_score_by_vector.return_value = [
+        (mocker.Mock(page_content="def a(): pass", metadata={"source": "data/a.py"}), 0.25),
+    ]
+    mocker.patch.object(rag_module, "vectorstore", mock_store)
+    mocker.patch.object(rag_module, "_query_embeddings", rag_module.OrderedDict())
+    mock_chain = mocker.patch.object(rag_module, "qa_chain")
+
+    result = rag_module.retrieve("def b(): pass", k=3)
+
+    assert result == [{"source": "data/a.py", "score": 0.25, "content": "def a(): pass"}]
+    mock_store.embeddings.embed_query.assert_called_once_with("def b(): pass")
+    mock_store.similarity_search_with_score_by_vector.assert_called_once_with([0.1, 0.2], k=3)
+    mock_chain.assert_not_called()
+
+
+def test_query_embeddings_are_cached_by_content(mocker):
+    """
+    Tests that each code is embedded once, warmed codes in a single batch.
+    """
+    mock_store = mocker.Mock()
+    mock_store.embeddings.embed_query.side_effect = lambda code: [float(len(code))]
+    mock_store.embeddings.embed_documents.side_effect = lambda codes: [[float(len(code))] for code in codes]
+    mocker.patch.object(rag_module, "vectorstore", mock_store)
+    mocker.patch.object(rag_module, "_query_embeddings", rag_module.OrderedDict())
+    mocker.patch.object(rag_module, "QUERY_EMBEDDING_CACHE_SIZE", 3)
+
+    assert rag_module.warm_query_embeddings(["a", "bb", "a"]) == 2
+    assert rag_module.warm_query_embeddings(["a", "ccc"]) == 1
+    assert rag_module.embed_query("bb") == [2.0]
+    mock_store.embeddings.embed_query.assert_not_called()
+
+    rag_module.embed_query("dddd")
+    rag_module.embed_query("dddd")
+    assert mock_store.embeddings.embed_query.call_count == 1
+    assert list(rag_module._query_embeddings) == [
+        rag_module.hashlib.sha256(code.encode()).hexdigest() for code in ["ccc", "bb", "dddd"]
+    ]
@@ -0,0 +1,133 @@
+import sys
+import asyncio
+import importlib.util
+from pathlib import Path
+from unittest.mock import MagicMock, AsyncMock
+import pytest
+
+remediation_path = Path(__file__).resolve().parents[1] / "remediation.py"
+spec = importlib.util.spec_from_file_location("remediation_module", remediation_path)
+remediation_module = importlib.util.module_from_spec(spec)
+sys.modules["remediation_module"] = remediation_module
+spec.loader.exec_module(remediation_module)
+
+
+def make_issue(key, path, line, status="OPEN"):
+    return {
+        "key": key, "project": "quality", "component": f"quality:{path}", "line": line,
+        "rule": "python:S1481", "severity": "MINOR", "message": "Remove the unused local variable", "status": status,
+    }
+
+
+@pytest.fixture
+def source_root(tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("def a():\n    x = 1\n    y = 2\n    return 0\n")
+    (tmp_path / "src" / "b.py").write_text("def b():\n    z = 3\n")
+    return tmp_path
+
+
+@pytest.fixture
+def mock_answer(monkeypatch):
+    """
+    Fixture that records the questions sent to the LLM instead of asking it.
+    """
+    answer = MagicMock(side_effect=lambda question, code: f"remediation {answer.call_count}")
+    monkeypatch.setattr(remediation_module.rag_module, "answer", answer)
+    return answer
+
+
+@pytest.fixture
+def mock_db():
+    """
+    Fixture for a database whose remediations collection records its calls.
+    """
+    collection = MagicMock(update_one=AsyncMock())
+    collection.find.return_value.to_list = AsyncMock(return_value=[])
+    db = MagicMock()
+    db.get_collection.return_value = collection
+    return db
+
+
+def test_remediate_sends_one_request_per_file(mock_db, mock_answer, source_root):
+    """
+    Tests that all issues of a file are remediated in one request, stored by component.
+    """
+    issues = [make_issue("AX1", "src/a.py", 3), make_issue("AX2", "src/b.py", 2), make_issue("AX3", "src/a.py", 2)]
+
+    remediated, failed = asyncio.run(remediation_module.remediate(mock_db, issues, source_root))
+
+    assert (remediated, failed) == (2, 0)
+    assert mock_answer.call_count == 2
+    question, code = next(c.args for c in mock_answer.call_args_list if "src/a.py" in c.args[0])
+    assert question.index("AX3 (line 2") < question.index("AX1 (line 3")
+    assert "    3      y = 2" in question
+    assert code == "def a():\n    x = 1\n    y = 2\n    return 0"
+    stored = {c.args[0]["_id"]: c.args[1]["$set"] for c in mock_db.get_collection.return_value.update_one.await_args_list}
+    assert stored["quality:src/a.py"]["issue_keys"] == ["AX1", "AX3"]
+    assert stored["quality:src/a.py"]["remediation"].startswith("remediation")
+    assert stored["quality:src/a.py"]["requests"] == 1
+
+
+def test_remediate_skips_files_already_remediated(mock_db, mock_answer, source_root):
+    """
+    Tests that a file whose stored remediation covers the same issues is not sent again.
+    """
+    mock_db.get_collection.return_value.find.return_value.to_list.return_value = [
+        {"_id": "quality:src/a.py", "issue_keys": ["AX1"]},
+        {"_id": "quality:src/b.py", "issue_keys": ["AX9"]},
+    ]
+    issues = [make_issue("AX1", "src/a.py", 3), make_issue("AX2", "src/b.py", 2)]
+
+    assert asyncio.run(remediation_module.remediate(mock_db, issues, source_root)) == (1, 0)
+    assert "src/b.py" in mock_answer.call_args.args[0]
+
+
+def test_remediate_records_unreadable_files_as_failed(mock_db, mock_answer, source_root):
+    """
+    Tests that a file that cannot be read is stored with its error.
+    """
+    issues = [make_issue("AX1", "src/missing.py", 1)]
+
+    assert asyncio.run(remediation_module.remediate(mock_db, issues, source_root)) == (0, 1)
+    mock_answer.assert_not_called()
+    assert "error" in mock_db.get_collection.return_value.update_one.await_args.args[1]["$set"]
+
+
+def test_remediate_file_splits_many_issues(monkeypatch, mock_answer, source_root):
+    """
+    Tests that files with more than REMEDIATION_MAX_ISSUES issues are remediated in several requests.
+    """
+    monkeypatch.setattr(remediation_module, "REMEDIATION_MAX_ISSUES", 2)
+    issues = [make_issue(f"AX{i}", "src/a.py", 2) for i in range(5)]
+
+    record = remediation_module.remediate_file("quality:src/a.py", issues, source_root)
+
+    assert record["requests"] == 3
+    assert mock_answer.call_count == 3
+
+
+def test_code_excerpt_keeps_lines_around_issues_when_over_budget(monkeypatch):
+    """
+    Tests that a file over the budget is cut down to the lines around its issues.
+    """
+    monkeypatch.setattr(remediation_module, "ISSUE_CONTEXT_LINES", 1)
+    code = "\n".join(f"line_{n} = {n}" for n in range(1, 101))
+
+    numbered, plain = remediation_module.code_excerpt(code, [{"line": 10}, {"line": 50}], budget=50)
+
+    assert plain.splitlines() == ["line_9 = 9", "line_10 = 10", "line_11 = 11", "line_49 = 49", "line_50 = 50", "line_51 = 51"]
+    assert "\n...\n" in numbered
+    assert numbered.startswith("    9  line_9 = 9")
+
+
+def test_read_issues_file_keeps_open_issues(tmp_path):
+    """
+    Tests that only open issues are read from a CSV export, with their lines as numbers.
+    """
+    path = tmp_path / "issues.csv"
+    path.write_text("key,component,line,status\nAX1,quality:src/a.py,3,OPEN\nAX2,quality:src/a.py,,CLOSED\nAX3,quality:src/b.py,,REOPENED\n")
+
+    issues = remediation_module.read_issues_file(str(path))
+
+    assert [(i["key"], i["line"]) for i in issues] == [("AX1", 3), ("AX3", None)]
@@ -0,0 +1,255 @@
+import argparse
+import base64
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SONARQUBE_URL = os.getenv("SONARQUBE_URL", "http://localhost:9000")
+SONAR_PROJECT_KEY = os.getenv("SONAR_PROJECT_KEY", "quality")
+SONAR_TOKEN = os.getenv("SONAR_TOKEN", "")
+
+# Largest page SonarQube serves, and the most results it pages through per query
+PAGE_SIZE = 500
+MAX_RESULTS = 10000
+# Windows fetched at once, and how often a failed request is retried
+SONAR_PARALLELISM = int(os.getenv("SONAR_PARALLELISM", "4"))
+SONAR_RETRIES = int(os.getenv("SONAR_RETRIES", "5"))
+
+DEFAULT_WINDOW = timedelta(days=30)
+# Windows are not split below this, SonarQube dates have second precision
+MIN_WINDOW = timedelta(seconds=1)
+
+COLUMNS = [
+    "key", "rule", "severity", "type", "status", "resolution", "component", "project",
+    "line", "textRange", "message", "effort", "debt", "author", "tags",
+    "creationDate", "updateDate", "closeDate",
+]
+
+
+class SonarExportError(Exception):
+    """Raised when SonarQube answers with an error that retries did not fix"""
+
+
+def format_date(moment):
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+0000")
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+
+
+def issue_row(issue, columns=COLUMNS):
+    """
+    Flattens an issue into one value per column, nested values as JSON.
+    """
+    row = {}
+    for column in columns:
+        value = issue.get(column)
+        row[column] = json.dumps(value) if isinstance(value, (dict, list)) else value
+    return row
+
+
+class SonarExporter:
+    """
+    Fetches the issues of a project in creation date windows, several windows
+    at a time on one pooled session. Windows holding more issues than
+    SonarQube pages through are split in half until they fit.
+    """
+
+    def __init__(self, base_url=SONARQUBE_URL, project_key=SONAR_PROJECT_KEY, token=SONAR_TOKEN,
+                 parallelism=SONAR_PARALLELISM, retries=SONAR_RETRIES, backoff_factor=0.5,
+                 page_size=PAGE_SIZE, max_results=MAX_RESULTS, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.project_key = project_key
+        self.parallelism = parallelism
+        self.page_size = page_size
+        self.max_results = max_results
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=parallelism, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if token:
+            auth = base64.b64encode(f"{token}:".encode()).decode()
+            self.session.headers["Authorization"] = f"Basic {auth}"
+
+    def search(self, **params):
+        """
+        Returns one page of /api/issues/search for the project.
+        """
+        params = {"componentKeys": self.project_key, "ps": self.page_size, "p": 1, **params}
+        try:
+            response = self.session.get(f"{self.base_url}/api/issues/search", params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise SonarExportError(f"Failed to fetch issues: {e}") from e
+        if response.status_code != 200:
+            raise SonarExportError(f"Failed to fetch issues. Status code: {response.status_code}: {response.text}")
+        return response.json()
+
+    def fetch_window(self, start, end):
+        """
+        Returns the issues created in [start, end), or None when there are
+        more than can be paged through and the window must be split.
+        """
+        params = {"createdAfter": format_date(start), "createdBefore": format_date(end)}
+        data = self.search(p=1, **params)
+        total = data.get("paging", {}).get("total", data.get("total", 0))
+        if total > self.max_results and end - start > MIN_WINDOW:
+            return None
+        if total > self.max_results:
+            print(f"⚠️ {total} issues created at {format_date(start)}, only the first {self.max_results} are exported")
+
+        issues = list(data.get("issues", []))
+        page = 1
+        while len(issues) < min(total, self.max_results) and data.get("issues"):
+            page += 1
+            data = self.search(p=page, **params)
+            issues.extend(data.get("issues", []))
+        return issues
+
+    def iter_issues(self, start, end=None, window=DEFAULT_WINDOW):
+        """
+        Yields the issues created between start and end, window by window as
+        each one completes, so callers can write them without holding the
+        whole export in memory. At most parallelism windows are in flight,
+        and the ones not yet fetched are cancelled when an error is raised or
+        the caller stops reading.
+        """
+        end = end or datetime.now(timezone.utc)
+        windows = deque()
+        while start < end:
+            windows.append((start, min(start + window, end)))
+            start += window
+
+        executor = ThreadPoolExecutor(max_workers=self.parallelism)
+        pending = {}
+        try:
+            while windows or pending:
+                while windows and len(pending) < self.parallelism:
+                    next_window = windows.popleft()
+                    pending[executor.submit(self.fetch_window, *next_window)] = next_window
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    window_start, window_end = pending.pop(future)
+                    issues = future.result()
+                    if issues is None:
+                        middle = window_start + (window_end - window_start) / 2
+                        windows.extendleft([(middle, window_end), (window_start, middle)])
+                        continue
+                    yield from issues
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def fetch_updated_since(self, mark):
+        """
+        Returns the issues updated at or after mark, newest first, or None
+        when more have changed than can be paged through. SonarQube has no
+        updatedAfter filter, so pages sorted by update date are read until
+        one reaches back past the mark.
+        """
+        issues = []
+        page = 1
+        while True:
+            data = self.search(p=page, s="UPDATE_DATE", asc="false")
+            batch = data.get("issues", [])
+            for issue in batch:
+                if parse_date(issue["updateDate"]) < mark:
+                    return issues
+                issues.append(issue)
+            total = data.get("paging", {}).get("total", data.get("total", 0))
+            if not batch or page * self.page_size >= total:
+                return issues
+            if (page + 1) * self.page_size > self.max_results:
+                return None
+            page += 1
+
+    def close(self):
+        self.session.close()
+
+
+def write_csv(issues, path, columns=COLUMNS):
+    """
+    Writes issues to a CSV file as they arrive and returns how many were written.
+    """
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for issue in issues:
+            writer.writerow(issue_row(issue, columns))
+            count += 1
+    return count
+
+
+def write_parquet(issues, path, columns=COLUMNS, batch_size=5000):
+    """
+    Writes issues to a Parquet file in row groups of batch_size and returns
+    how many were written. Every column is stored as a string.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise SonarExportError("Parquet export requires pyarrow, pip install pyarrow") from e
+
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    count = 0
+    batch = []
+
+    def flush(writer):
+        rows = [{k: None if v is None else str(v) for k, v in issue_row(i, columns).items()} for i in batch]
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+        batch.clear()
+
+    with pq.ParquetWriter(path, schema) as writer:
+        for issue in issues:
+            batch.append(issue)
+            count += 1
+            if len(batch) >= batch_size:
+                flush(writer)
+        if batch:
+            flush(writer)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export SonarQube issues")
+    parser.add_argument("--url", default=SONARQUBE_URL, help="SonarQube server URL")
+    parser.add_argument("--project", default=SONAR_PROJECT_KEY, help="Project key")
+    parser.add_argument("--output", default="sonarqube_issues.csv", help="Output file, .csv or .parquet")
+    parser.add_argument("--since", default="2000-01-01", help="Export issues created on or after this date")
+    parser.add_argument("--window-days", type=int, default=DEFAULT_WINDOW.days, help="Initial size of the date windows")
+    parser.add_argument("--parallelism", type=int, default=SONAR_PARALLELISM, help="Windows fetched at once")
+    args = parser.parse_args(argv)
+
+    since = datetime.strptime(args.since, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    exporter = SonarExporter(args.url, args.project, parallelism=args.parallelism)
+    write = write_parquet if args.output.endswith(".parquet") else write_csv
+    try:
+        count = write(exporter.iter_issues(since, window=timedelta(days=args.window_days)), args.output)
+    finally:
+        exporter.close()
+
+    if count:
+        print(f"{count} issues exported to {args.output}")
+    else:
+        print("No issues found.")
+    return count
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -0,0 +1,265 @@
+import sys
+import importlib.util
+import csv
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import pytest
+
+exporter_path = Path(__file__).resolve().parents[1] / "exporter.py"
+spec = importlib.util.spec_from_file_location("exporter_module", exporter_path)
+exporter_module = importlib.util.module_from_spec(spec)
+sys.modules["exporter_module"] = exporter_module
+spec.loader.exec_module(exporter_module)
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def sonar_date(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%S+0000")
+
+
+def make_issues(count, spacing=timedelta(hours=1)):
+    return [
+        {
+            "key": f"AX{i}",
+            "rule": "python:S1481",
+            "severity": "MINOR",
+            "component": f"quality:src/m{i % 3}.py",
+            "line": i + 1,
+            "message": "Remove the unused local variable",
+            "tags": ["unused"],
+            "creationDate": sonar_date(START + i * spacing),
+            "updateDate": sonar_date(START + i * spacing),
+        }
+        for i in range(count)
+    ]
+
+
+class StubSonarQube:
+    """
+    Serves /api/issues/search from a list of issues on a local port, with
+    SonarQube's paging, result cap, exclusive createdBefore and sorting by
+    update date.
+    """
+
+    def __init__(self, issues, max_results=20, failures=0):
+        self.issues = issues
+        self.max_results = max_results
+        self.failures = failures
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                stub.requests.append(query)
+                if stub.failures:
+                    stub.failures -= 1
+                    return self.reply(503, {"errors": [{"msg": "busy"}]})
+                page, size = int(query["p"]), int(query["ps"])
+                if page * size > stub.max_results:
+                    return self.reply(400, {"errors": [{"msg": f"Can return only the first {stub.max_results} results"}]})
+                matching = stub.issues
+                if "createdAfter" in query:
+                    after = datetime.strptime(query["createdAfter"], "%Y-%m-%dT%H:%M:%S%z")
+                    before = datetime.strptime(query["createdBefore"], "%Y-%m-%dT%H:%M:%S%z")
+                    matching = [
+                        issue for issue in matching
+                        if after <= datetime.strptime(issue["creationDate"], "%Y-%m-%dT%H:%M:%S%z") < before
+                    ]
+                if query.get("s") == "UPDATE_DATE":
+                    matching = sorted(matching, key=lambda i: i["updateDate"], reverse=query.get("asc") == "false")
+                issues = matching[(page - 1) * size:page * size]
+                self.reply(200, {"paging": {"pageIndex": page, "pageSize": size, "total": len(matching)}, "issues": issues})
+
+            def reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(issues, **kwargs):
+        server = StubSonarQube(issues, **kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def exporter_for(server, **kwargs):
+    kwargs = {"token": "secret", "page_size": 5, "max_results": server.max_results, "backoff_factor": 0, **kwargs}
+    return exporter_module.SonarExporter(server.url, "quality", **kwargs)
+
+
+def test_iter_issues_fetches_every_window_and_page(stub):
+    """
+    Tests that all issues are exported exactly once across windows and pages.
+    """
+    issues = make_issues(30)
+    server = stub(issues, max_results=100)
+    exporter = exporter_for(server)
+
+    exported = list(exporter.iter_issues(START, START + timedelta(days=2), window=timedelta(hours=12)))
+
+    assert sorted(i["key"] for i in exported) == sorted(i["key"] for i in issues)
+    assert all(r["componentKeys"] == "quality" for r in server.requests)
+
+
+def test_iter_issues_splits_windows_over_the_result_cap(stub):
+    """
+    Tests that a window holding more issues than can be paged through is split until each half fits.
+    """
+    issues = make_issues(50, spacing=timedelta(minutes=10))
+    server = stub(issues, max_results=20)
+    exporter = exporter_for(server)
+
+    exported = list(exporter.iter_issues(START, START + timedelta(days=1), window=timedelta(days=1)))
+
+    assert sorted(i["key"] for i in exported) == sorted(i["key"] for i in issues)
+    windows = {(r["createdAfter"], r["createdBefore"]) for r in server.requests}
+    assert len(windows) > 3
+
+
+def test_iter_issues_retries_failed_requests(stub):
+    """
+    Tests that requests answered with 503 are retried on the pooled session.
+    """
+    server = stub(make_issues(3), max_results=100, failures=2)
+    exporter = exporter_for(server)
+
+    exported = list(exporter.iter_issues(START, START + timedelta(days=1), window=timedelta(days=1)))
+
+    assert len(exported) == 3
+    assert len(server.requests) == 3
+
+
+def test_iter_issues_raises_when_retries_run_out(stub):
+    """
+    Tests that an export fails loudly once the retries are used up.
+    """
+    server = stub(make_issues(3), max_results=100, failures=10)
+    exporter = exporter_for(server, retries=1)
+
+    with pytest.raises(exporter_module.SonarExportError):
+        list(exporter.iter_issues(START, START + timedelta(days=1), window=timedelta(days=1)))
+
+
+def test_iter_issues_stops_requesting_after_an_error(stub):
+    """
+    Tests that a failing window fails the export without fetching the windows still queued.
+    """
+    server = stub(make_issues(3), max_results=100, failures=1000)
+    exporter = exporter_for(server, retries=0, parallelism=2)
+
+    with pytest.raises(exporter_module.SonarExportError):
+        list(exporter.iter_issues(START, START + timedelta(days=100), window=timedelta(days=1)))
+
+    assert len(server.requests) <= 4
+
+
+def test_iter_issues_stops_requesting_when_the_caller_stops_reading(stub):
+    """
+    Tests that closing the generator early leaves the remaining windows unfetched.
+    """
+    server = stub(make_issues(30), max_results=100)
+    exporter = exporter_for(server, parallelism=2)
+
+    issues = exporter.iter_issues(START, START + timedelta(days=100), window=timedelta(hours=1))
+    next(issues)
+    issues.close()
+
+    assert len(server.requests) <= 4
+
+
+def test_fetch_updated_since_stops_at_the_mark(stub):
+    """
+    Tests that only issues updated at or after the mark are fetched, without paging past it.
+    """
+    server = stub(make_issues(30), max_results=100)
+    exporter = exporter_for(server)
+
+    issues = exporter.fetch_updated_since(START + timedelta(hours=22))
+
+    assert [i["key"] for i in issues] == [f"AX{i}" for i in range(29, 21, -1)]
+    assert [r["p"] for r in server.requests] == ["1", "2"]
+    assert all(r["s"] == "UPDATE_DATE" and r["asc"] == "false" for r in server.requests)
+
+
+def test_fetch_updated_since_returns_none_past_the_result_cap(stub):
+    """
+    Tests that None is returned when more issues changed than can be paged through.
+    """
+    server = stub(make_issues(30), max_results=10)
+    exporter = exporter_for(server)
+
+    assert exporter.fetch_updated_since(START) is None
+
+
+def test_write_csv_streams_flattened_rows(tmp_path):
+    """
+    Tests that rows have one value per column, nested values as JSON.
+    """
+    path = tmp_path / "issues.csv"
+
+    count = exporter_module.write_csv(iter(make_issues(3)), str(path))
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert count == 3
+    assert rows[0]["key"] == "AX0"
+    assert json.loads(rows[0]["tags"]) == ["unused"]
+    assert rows[0]["resolution"] == ""
+
+
+def test_write_parquet_writes_row_groups(tmp_path):
+    """
+    Tests that issues are written to Parquet in row groups of batch_size.
+    """
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "issues.parquet"
+
+    count = exporter_module.write_parquet(iter(make_issues(7)), str(path), batch_size=3)
+
+    table = pq.read_table(path)
+    assert count == 7
+    assert table.column("key").to_pylist() == [f"AX{i}" for i in range(7)]
+    assert pq.ParquetFile(path).num_row_groups == 3
+
+
+def test_main_exports_to_csv(stub, tmp_path):
+    """
+    Tests the command line export against the stub server.
+    """
+    server = stub(make_issues(12), max_results=10000)
+    output = tmp_path / "out.csv"
+
+    count = exporter_module.main([
+        "--url", server.url, "--output", str(output), "--since", "2024-01-01", "--window-days", "30",
+    ])
+
+    assert count == 12
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 13
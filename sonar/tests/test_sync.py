@@ -0,0 +1,122 @@
+import sys
+import asyncio
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import MagicMock, AsyncMock
+import pytest
+
+sync_path = Path(__file__).resolve().parents[1] / "sync.py"
+spec = importlib.util.spec_from_file_location("sync_module", sync_path)
+sync_module = importlib.util.module_from_spec(spec)
+sys.modules["sync_module"] = sync_module
+spec.loader.exec_module(sync_module)
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_issue(i):
+    date = (START + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%S+0000")
+    return {"key": f"AX{i}", "project": "quality", "component": "quality:src/m.py", "creationDate": date, "updateDate": date}
+
+
+@pytest.fixture
+def mock_db():
+    """
+    Fixture for a database whose collections record their calls.
+    """
+    collections = {}
+
+    def get_collection(name):
+        if name not in collections:
+            collections[name] = MagicMock(
+                create_index=AsyncMock(), bulk_write=AsyncMock(), find_one=AsyncMock(return_value=None),
+                update_one=AsyncMock(),
+            )
+        return collections[name]
+
+    db = MagicMock()
+    db.get_collection.side_effect = get_collection
+    return db
+
+
+@pytest.fixture
+def exporter():
+    exporter = MagicMock(project_key="quality", max_results=10000)
+    exporter.iter_issues.return_value = iter([make_issue(i) for i in range(5)])
+    return exporter
+
+
+def upserted_keys(collection):
+    return [op._filter["_id"] for call in collection.bulk_write.await_args_list for op in call.args[0]]
+
+
+def test_first_sync_reads_every_issue_and_stores_the_mark(mock_db, exporter):
+    """
+    Tests that without a mark every issue is upserted and the latest updateDate becomes the mark.
+    """
+    count = asyncio.run(sync_module.sync(exporter, mock_db))
+
+    assert count == 5
+    exporter.iter_issues.assert_called_once_with(sync_module.FULL_SYNC_SINCE)
+    exporter.fetch_updated_since.assert_not_called()
+    assert upserted_keys(mock_db.get_collection("sonar_issues")) == [f"AX{i}" for i in range(5)]
+    mark_update = mock_db.get_collection("sonar_sync").update_one.await_args
+    assert mark_update.args[0] == {"_id": "quality"}
+    assert mark_update.args[1]["$set"]["updateDate"] == START + timedelta(hours=4)
+
+
+def test_sync_fetches_only_issues_changed_since_the_mark(mock_db, exporter):
+    """
+    Tests that a stored mark limits the sync to issues updated since, with the mark read back from naive UTC.
+    """
+    mock_db.get_collection("sonar_sync").find_one.return_value = {"_id": "quality", "updateDate": datetime(2024, 1, 1, 3)}
+    exporter.fetch_updated_since.return_value = [make_issue(6), make_issue(3)]
+
+    count = asyncio.run(sync_module.sync(exporter, mock_db))
+
+    assert count == 2
+    exporter.fetch_updated_since.assert_called_once_with(START + timedelta(hours=3))
+    exporter.iter_issues.assert_not_called()
+    assert upserted_keys(mock_db.get_collection("sonar_issues")) == ["AX6", "AX3"]
+    assert mock_db.get_collection("sonar_sync").update_one.await_args.args[1]["$set"]["updateDate"] == START + timedelta(hours=6)
+
+
+def test_sync_falls_back_to_full_sync_past_the_result_cap(mock_db, exporter):
+    """
+    Tests that every issue is synced when more changed since the mark than can be paged through.
+    """
+    mock_db.get_collection("sonar_sync").find_one.return_value = {"_id": "quality", "updateDate": START}
+    exporter.fetch_updated_since.return_value = None
+
+    assert asyncio.run(sync_module.sync(exporter, mock_db)) == 5
+    exporter.iter_issues.assert_called_once()
+
+
+def test_sync_without_changes_keeps_the_mark(mock_db, exporter):
+    """
+    Tests that the mark is left alone when nothing changed.
+    """
+    mock_db.get_collection("sonar_sync").find_one.return_value = {"_id": "quality", "updateDate": START}
+    exporter.fetch_updated_since.return_value = []
+
+    assert asyncio.run(sync_module.sync(exporter, mock_db)) == 0
+    mock_db.get_collection("sonar_issues").bulk_write.assert_not_called()
+    mock_db.get_collection("sonar_sync").update_one.assert_not_called()
+
+
+def test_upsert_issues_writes_in_batches(mock_db):
+    """
+    Tests that issues are upserted by key in unordered batches, with dates stored as datetimes.
+    """
+    count, latest = asyncio.run(sync_module.upsert_issues(mock_db, (make_issue(i) for i in range(5)), batch_size=2))
+
+    bulk_write = mock_db.get_collection("sonar_issues").bulk_write
+    assert count == 5
+    assert latest == START + timedelta(hours=4)
+    assert [len(call.args[0]) for call in bulk_write.await_args_list] == [2, 2, 1]
+    assert all(call.kwargs == {"ordered": False} for call in bulk_write.await_args_list)
+    operation = bulk_write.await_args_list[0].args[0][0]
+    assert operation._upsert is True
+    assert operation._doc["$set"]["creationDate"] == START
+    assert "key" not in operation._doc["$set"]